@@ -1,14 +1,14 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from PIL import Image, ImageTk
+import multiprocessing
 import os
 import sys
-import pandas as pd
 
-# 导入核心处理模块和版本信息
-from core import single_core
-from core import dual_core_gui_adapter
+# 只导入轻量模块；pandas、openpyxl 与处理模块在后台进程中预先导入（见 core.backend），
+# PIL 在窗口显示后才导入，窗口因此可以立即出现
 from core._version import __version__, __author__
+from core.backend import WarmBackend
+from core.progress import ProcessingCancelled
 
 # ================= 配置区 =================
 # 语言包字典
@@ -17,13 +17,18 @@ TRANSLATIONS = {
     "mode_label": {"zh": "选择处理模式:", "en": "Select Mode:"},
     "single": {"zh": "单通道 (Intensity)", "en": "Single (Intensity)"},
     "dual": {"zh": "双通道 (Ratio)", "en": "Dual (Ratio)"},
+    "wells_label": {"zh": "孔板规格:", "en": "Plate:"},
+    "wells_auto": {"zh": "自动", "en": "Auto"},
     "file_label": {"zh": "📁 选择 Excel 文件:", "en": "📁 Select Excel File:"},
     "browse_btn": {"zh": "🔍 浏览文件", "en": "🔍 Browse"},
     "status_waiting": {"zh": "", "en": ""},
     "status_processing": {"zh": "⏳ 正在处理，请稍候...", "en": "⏳ Processing, please wait..."},
     "status_done": {"zh": "✅ 处理完成", "en": "✅ Done"},
     "status_error": {"zh": "❌ 出错", "en": "❌ Error"},
+    "status_cancelling": {"zh": "⏹ 正在取消...", "en": "⏹ Cancelling..."},
+    "status_cancelled": {"zh": "⏹ 已取消", "en": "⏹ Cancelled"},
     "run_btn": {"zh": "🟢 开始处理", "en": "🟢 Run Process"},
+    "cancel_btn": {"zh": "⏹ 取消处理", "en": "⏹ Cancel"},
     "quit_btn": {"zh": "❌ 关闭程序", "en": "❌ Exit"},
     "warn_title": {"zh": "警告", "en": "Warning"},
     "warn_no_file": {"zh": "请选择有效的 Excel 文件", "en": "Please select a valid Excel file."},
@@ -34,6 +39,12 @@ TRANSLATIONS = {
     "copyright": {"zh": f"© 2025 {__author__} — v{__version__}", "en": f"© 2025 {__author__} — v{__version__}"}
 }
 
+# 孔板规格选项（首项为“自动”，按输入判断）；与 core.layout.PLATE_FORMATS 一致
+WELL_CHOICES = [96, 384, 1536]
+
+# 进度刷新间隔 (毫秒)，约 30 帧/秒
+PROGRESS_INTERVAL_MS = 33
+
 # 当前语言状态 (默认中文)
 current_lang = "zh"
 # 存储UI元素的引用，以便更新文字
@@ -63,18 +74,24 @@ def update_ui_text(root):
     ui_elements['mode_label'].config(text=get_text("mode_label"))
     ui_elements['single_radio'].config(text=get_text("single"))
     ui_elements['dual_radio'].config(text=get_text("dual"))
+    ui_elements['wells_label'].config(text=get_text("wells_label"))
+    wells_box = ui_elements['wells_box']
+    selected = wells_box.current()
+    wells_box.config(values=[get_text("wells_auto")] + WELL_CHOICES)
+    wells_box.current(selected)
     ui_elements['file_label'].config(text=get_text("file_label"))
     ui_elements['copyright_label'].config(text=get_text("copyright"))
     ui_elements['lang_btn'].config(text=get_text("lang_switch"))
 
     # 更新 Canvas 自定义按钮的文本
-    for btn_key in ['browse_btn', 'run_btn', 'quit_btn']:
+    for btn_key in ['browse_btn', 'run_btn', 'cancel_btn', 'quit_btn']:
         canvas, text_id = ui_elements[btn_key]
         canvas.itemconfigure(text_id, text=get_text(btn_key))
 
-def start_gui():
+def create_app():
+    """创建主窗口与全部控件并返回 root（不进入 mainloop）；Logo 与处理后端在窗口显示后加载"""
     root = tk.Tk()
-    root.geometry("300x560") #稍微加高一点以容纳语言按钮
+    root.geometry("300x640") #稍微加高一点以容纳语言、孔板规格与取消按钮
     root.configure(bg="#FFF5E5")
     root.resizable(False, False)
     
@@ -95,16 +112,23 @@ def start_gui():
     ui_elements['lang_btn'] = lang_btn
 
     # === Logo ===
-    try:
-        # 注意：这里路径改为了 assets
-        img_path = resource_path(os.path.join("assets", "WK.png"))
-        img = Image.open(img_path).resize((70, 70))
-        logo_img = ImageTk.PhotoImage(img)
-        logo_label = tk.Label(root, image=logo_img, bg="#FFF5E5")
-        logo_label.image = logo_img
-        logo_label.pack(pady=5)
-    except Exception as e:
-        print(f"⚠️ 图片加载失败：{e}")
+    # 先占位，窗口显示后再导入 PIL 加载图片
+    placeholder = tk.PhotoImage(width=70, height=70)
+    logo_label = tk.Label(root, image=placeholder, bg="#FFF5E5")
+    logo_label.image = placeholder
+    logo_label.pack(pady=5)
+
+    def load_logo():
+        try:
+            from PIL import Image, ImageTk
+            # 注意：这里路径改为了 assets
+            img_path = resource_path(os.path.join("assets", "WK.png"))
+            img = Image.open(img_path).resize((70, 70))
+            logo_img = ImageTk.PhotoImage(img)
+            logo_label.config(image=logo_img)
+            logo_label.image = logo_img
+        except Exception as e:
+            print(f"⚠️ 图片加载失败：{e}")
 
     # === 模式选择 ===
     mode_title = tk.Frame(root, bg="#FFF5E5")
@@ -147,6 +171,18 @@ def start_gui():
     update_button_styles()
     mode_var.trace_add("write", update_button_styles)
 
+    # === 孔板规格 ===
+    wells_frame = tk.Frame(root, bg="#FFF5E5")
+    wells_frame.pack(pady=(6, 0))
+    lbl_wells = tk.Label(wells_frame, text=TRANSLATIONS["wells_label"]["zh"], font=("Arial", 10), bg="#FFF5E5")
+    lbl_wells.pack(side=tk.LEFT)
+    wells_box = ttk.Combobox(wells_frame, state="readonly", width=6,
+                             values=[TRANSLATIONS["wells_auto"]["zh"]] + WELL_CHOICES)
+    wells_box.current(0)
+    wells_box.pack(side=tk.LEFT, padx=4)
+    ui_elements['wells_label'] = lbl_wells
+    ui_elements['wells_box'] = wells_box
+
     # === 文件选择 ===
     lbl_file = tk.Label(root, text=TRANSLATIONS["file_label"]["zh"], bg="#FFF5E5")
     lbl_file.pack(pady=(10, 2))
@@ -174,58 +210,92 @@ def start_gui():
     progress.pack_forget()
 
     # === 运行逻辑 ===
-    def run_clicked():
-        file_path = selected_file.get().strip()
-        if not file_path or not os.path.exists(file_path):
-            messagebox.showwarning(get_text("warn_title"), get_text("warn_no_file"))
-            return
-        
-        try:
-            selected_mode = mode_var.get()
-            sheet_count = len(pd.ExcelFile(file_path).sheet_names)
-
-            # 估算步骤
-            if selected_mode == "single":
-                estimated_steps = sheet_count * 12 + 10 
+    # 处理在常驻的后台进程中进行（启动后立即预先导入处理模块）；
+    # 进度经后端队列传回，界面由 root.after 定时刷新
+    job = {'future': None, 'backend': None, 'total': 0, 'done': 0, 'cancelling': False}
+
+    def start_backend():
+        job['backend'] = WarmBackend()
+
+    def poll_messages():
+        future = job['future']
+        for kind, payload in job['backend'].poll():
+            if kind == 'total':
+                job['total'], job['done'] = payload, 0
+                progress.config(maximum=payload, value=0)
             else:
-                estimated_steps = sheet_count * 5 * 8 + 10
-
-            progress.config(maximum=estimated_steps, value=0)
-            progress.pack()
-            status_label.config(text=get_text("status_processing"))
-            root.update_idletasks()
+                job['done'] += payload
 
-            def update_progress():
-                progress['value'] += 1
-                root.update_idletasks()
-
-            if selected_mode == "single":
-                files = single_core.run_main(file_path, on_step=update_progress)
-            else:
-                files = dual_core_gui_adapter.run_main(file_path, on_step=update_progress)
-
-            status_label.config(text=get_text("status_done"))
-            progress['value'] = estimated_steps
-            root.update_idletasks()
-            
-            messagebox.showinfo(get_text("info_title"), get_text("info_success") + "\n".join(files))
-            root.after(1000, progress.pack_forget)
+        if not future.done():
+            progress['value'] = min(job['done'], job['total'])
+            root.after(PROGRESS_INTERVAL_MS, poll_messages)
+            return
 
+        job['future'] = None
+        try:
+            files = future.result()
+        except ProcessingCancelled:
+            progress.pack_forget()
+            status_label.config(text=get_text("status_cancelled"))
         except Exception as e:
             progress.pack_forget()
             status_label.config(text=get_text("status_error"))
             messagebox.showerror(get_text("err_title"), str(e))
+        else:
+            status_label.config(text=get_text("status_done"))
+            progress['value'] = job['total']
+            messagebox.showinfo(get_text("info_title"), get_text("info_success") + "\n".join(files))
+            root.after(1000, progress.pack_forget)
 
-    # 自定义按钮 - 运行与退出
+    def run_clicked():
+        if job['future'] is not None:
+            return
+        file_path = selected_file.get().strip()
+        if not file_path or not os.path.exists(file_path):
+            messagebox.showwarning(get_text("warn_title"), get_text("warn_no_file"))
+            return
+
+        progress.config(maximum=1, value=0)
+        progress.pack()
+        status_label.config(text=get_text("status_processing"))
+
+        if job['backend'] is None:
+            start_backend()
+        job['cancelling'] = False
+        index = wells_box.current()
+        wells = WELL_CHOICES[index - 1] if index > 0 else None
+        job['future'] = job['backend'].submit(mode_var.get(), file_path, wells)
+        root.after(PROGRESS_INTERVAL_MS, poll_messages)
+
+    def cancel_clicked():
+        if job['future'] is not None and not job['cancelling']:
+            job['cancelling'] = True
+            job['backend'].cancel()
+            status_label.config(text=get_text("status_cancelling"))
+
+    def quit_clicked():
+        if job['backend'] is not None:
+            job['backend'].shutdown()
+        root.quit()
+
+    # 自定义按钮 - 运行、取消与退出
     ui_elements['run_btn'] = create_custom_button(root, "run_btn", run_clicked)
-    ui_elements['quit_btn'] = create_custom_button(root, "quit_btn", root.quit)
+    ui_elements['cancel_btn'] = create_custom_button(root, "cancel_btn", cancel_clicked)
+    ui_elements['quit_btn'] = create_custom_button(root, "quit_btn", quit_clicked)
+    root.protocol("WM_DELETE_WINDOW", quit_clicked)
 
     # === 底部版权 ===
     lbl_copy = tk.Label(root, text=TRANSLATIONS["copyright"]["zh"], fg="gray", bg="#FFF5E5", font=("Arial", 8))
     lbl_copy.pack(side=tk.BOTTOM, pady=8)
     ui_elements['copyright_label'] = lbl_copy
 
-    root.mainloop()
+    # 窗口显示后再加载 Logo 并启动处理后端
+    root.after_idle(load_logo)
+    root.after_idle(start_backend)
+    return root
+
+def start_gui():
+    create_app().mainloop()
 
 def create_custom_button(parent, text_key, command):
     """
@@ -252,4 +322,5 @@ def create_custom_button(parent, text_key, command):
     return canvas, text_id
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # PyInstaller 打包后后台进程也从 exe 启动
     start_gui()
\ No newline at end of file
@@ -0,0 +1,121 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import make_workbook
+from core import dual_core_gui_adapter, single_core
+from core._version import __version__
+from core.layout import PLATE_FORMATS
+from core.progress import STAGES, RunMetrics
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RUNNERS = {
+    'single': single_core.run_main,
+    'dual': dual_core_gui_adapter.run_main,
+}
+DEFAULT_SIZES = (1, 50, 500)
+
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak if platform.system() == 'Darwin' else peak * 1024
+
+def run_case(mode, source, output_dir, workers=None, trace_memory=False, streaming=False):
+    """在独立子进程中执行，保证峰值内存互不影响"""
+    if trace_memory:
+        tracemalloc.start()
+    metrics = RunMetrics()
+    start = time.perf_counter()
+    RUNNERS[mode](source, workers=workers, output_dir=output_dir, metrics=metrics,
+                  streaming=streaming)
+    seconds = time.perf_counter() - start
+    result = {'seconds': seconds, 'stages': metrics.finish().stages, 'peak_rss': peak_rss_bytes()}
+    if trace_memory:
+        result['peak_traced'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+def input_workbook(work_dir, mode, n_sheets, wells, plate=96):
+    """合成输入按参数缓存在 work_dir 中，重复运行时不再生成"""
+    suffix = '' if plate == 96 else f"-p{plate}"
+    path = os.path.join(work_dir, f"synthetic-{mode}-{n_sheets}x{wells}{suffix}.xlsx")
+    if not os.path.exists(path):
+        make_workbook(path, mode, n_sheets, wells, plate=plate)
+    return path
+
+def run_benchmarks(modes, sizes, wells=None, workers=None, repeat=1, work_dir=None,
+                   trace_memory=False, streaming=False, plate=96, on_result=None):
+    wells = wells or plate
+    work_dir = work_dir or os.path.join(tempfile.gettempdir(), 'mprocess-bench')
+    os.makedirs(work_dir, exist_ok=True)
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for mode in modes:
+        for n_sheets in sizes:
+            source = input_workbook(work_dir, mode, n_sheets, wells, plate)
+            output_dir = os.path.join(work_dir, f"out-{mode}-{n_sheets}")
+            for i in range(repeat):
+                with ctx.Pool(1) as pool:
+                    case = pool.apply(run_case, (mode, source, output_dir, workers, trace_memory,
+                                                 streaming))
+                case.update(mode=mode, sheets=n_sheets, wells=wells, plate=plate,
+                            workers=workers or 1,
+                            streaming=streaming,
+                            run=i + 1, input_bytes=os.path.getsize(source))
+                results.append(case)
+                if on_result: on_result(case)
+    return results
+
+def format_case(case):
+    stages = "  ".join(f"{name}={case['stages'][name]['seconds']:.2f}s"
+                       for name in STAGES if name in case['stages'])
+    memory = f"  rss={case['peak_rss'] / 2**20:.0f}MB" if case['peak_rss'] else ""
+    if 'peak_traced' in case:
+        memory += f"  traced={case['peak_traced'] / 2**20:.0f}MB"
+    return (f"{case['mode']:<6} {case['sheets']:>4} sheets  {case['seconds']:>8.2f}s  "
+            f"{case['sheets'] / case['seconds']:>7.1f} sheets/s{memory}  {stages}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.bench_core',
+        description='Time each stage of both run_main paths on synthetic workbooks.')
+    parser.add_argument('-m', '--modes', nargs='+', choices=sorted(RUNNERS), default=sorted(RUNNERS))
+    parser.add_argument('-n', '--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES),
+                        help='sheet counts to benchmark (default: 1 50 500)')
+    parser.add_argument('-p', '--plate', type=int, choices=sorted(PLATE_FORMATS), default=96,
+                        help='plate format of the synthetic inputs (default: 96)')
+    parser.add_argument('-w', '--wells', type=int, default=None,
+                        help='number of filled wells (default: the whole plate)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--work-dir', default=None,
+                        help='where synthetic inputs and outputs are kept between runs')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='also record the Python-level allocation peak (slower)')
+    parser.add_argument('--streaming', action='store_true',
+                        help='use the constant-memory streaming pipeline')
+    parser.add_argument('--json', help='write results to this file as a regression baseline')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.modes, args.sizes, args.wells, args.workers, args.repeat,
+                             args.work_dir, args.tracemalloc, args.streaming, args.plate,
+                             on_result=lambda case: print(format_case(case), flush=True))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'version': __version__, 'python': platform.python_version(),
+                       'machine': platform.machine(), 'cpus': os.cpu_count(),
+                       'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
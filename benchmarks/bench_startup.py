@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import make_workbook
+from core._version import __version__
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 每个场景在新的解释器中执行，最后一行输出 JSON：{指标: 秒}
+CASES = {
+    # GUI 入口模块的导入耗时（窗口出现前必须完成的部分）
+    'import_app': """
+t = time.perf_counter()
+import app
+result = {'seconds': time.perf_counter() - t}
+""",
+    # 处理模块及其依赖的导入耗时（过去在窗口出现前同步完成）
+    'import_pipelines': """
+t = time.perf_counter()
+from core import dual_core_gui_adapter, single_core
+result = {'seconds': time.perf_counter() - t}
+""",
+    # 进程启动到窗口首次绘制完成；没有显示器时跳过
+    'window': """
+t = time.perf_counter()
+import app
+try:
+    root = app.create_app()
+except Exception as e:  # tkinter.TclError: no display
+    result = {'skipped': str(e)}
+else:
+    root.update()
+    result = {'seconds': time.perf_counter() - t}
+    root.destroy()
+""",
+    # 后台进程预先导入完成所需的时间，以及此后首次处理一个文件的耗时
+    'warm_backend': """
+from core.backend import WarmBackend
+t = time.perf_counter()
+backend = WarmBackend()
+backend.warm.result()
+warm = time.perf_counter() - t
+t = time.perf_counter()
+backend.submit(MODE, SOURCE).result()
+result = {'seconds': warm, 'first_run': time.perf_counter() - t}
+backend.shutdown()
+""",
+    # 对照：不预热时首次处理一个文件（含导入）的耗时
+    'cold_run': """
+t = time.perf_counter()
+from core import dual_core_gui_adapter, single_core
+(single_core if MODE == 'single' else dual_core_gui_adapter).run_main(SOURCE)
+result = {'seconds': time.perf_counter() - t}
+""",
+}
+
+def run_case(name, mode, source):
+    """在新的解释器中执行一个场景，返回其结果字典"""
+    code = "\n".join([
+        "import json, sys, time",
+        f"MODE, SOURCE = {mode!r}, {source!r}",
+        "def main():",
+        *("    " + line for line in CASES[name].strip().splitlines()),
+        "    print(json.dumps(result))",
+        "if __name__ == '__main__':",
+        "    main()",
+    ])
+    path = os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')]))
+    env = dict(os.environ, PYTHONPATH=path)
+    proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def run_benchmarks(cases, mode='single', repeat=5, work_dir=None, on_result=None):
+    work_dir = work_dir or os.path.join(tempfile.gettempdir(), 'mprocess-bench')
+    os.makedirs(work_dir, exist_ok=True)
+    source = os.path.join(work_dir, f"startup-{mode}.xlsx")
+    if not os.path.exists(source):
+        make_workbook(source, mode, 1)
+    results = []
+    for name in cases:
+        runs = [run_case(name, mode, source) for _ in range(repeat)]
+        case = {'case': name, 'mode': mode, 'runs': runs}
+        for key in sorted({key for run in runs for key in run if key != 'skipped'}):
+            case[key] = statistics.median(run[key] for run in runs)
+        if 'seconds' not in case:
+            case['skipped'] = runs[0].get('skipped')
+        results.append(case)
+        if on_result: on_result(case)
+    return results
+
+def format_case(case):
+    if 'skipped' in case:
+        return f"{case['case']:<18} skipped ({case['skipped']})"
+    extra = f"  first run {case['first_run'] * 1000:7.0f} ms" if 'first_run' in case else ""
+    return f"{case['case']:<18} {case['seconds'] * 1000:7.0f} ms{extra}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.bench_startup',
+        description='Time GUI start-up, the deferred imports and the warm processing backend, '
+                    'each in a fresh interpreter.')
+    parser.add_argument('-c', '--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('-m', '--mode', choices=['single', 'dual'], default='single',
+                        help='pipeline used for the first-run cases (default: single)')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per case; the median is shown')
+    parser.add_argument('--work-dir', default=None,
+                        help='where the synthetic input and its outputs are kept')
+    parser.add_argument('--json', help='write results to this file as a regression baseline')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.cases, args.mode, args.repeat, args.work_dir,
+                             on_result=lambda case: print(format_case(case), flush=True))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'version': __version__, 'python': platform.python_version(),
+                       'machine': platform.machine(), 'cpus': os.cpu_count(),
+                       'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import os
+
+import numpy as np
+from openpyxl import Workbook
+
+from core.layout import DUAL, PLATE_FORMATS, SINGLE, row_window
+
+WELL_COUNT = 96
+TRAILING_ROWS = 5
+TREATMENTS = ['Ctrl', 'DrugA', 'DrugB', 'DrugC']
+
+def kinetic_curves(rng, n_points, wells):
+    """每孔一条上升动力学曲线：F0 + A·(1 - e^(-kt)) + 噪声，形状 (n_points, wells)"""
+    t = np.arange(n_points)[:, None]
+    f0 = rng.uniform(0.5, 1.5, wells)
+    amplitude = rng.uniform(-0.5, 3.0, wells)
+    rate = rng.uniform(0.1, 1.0, wells)
+    return f0 + amplitude * (1 - np.exp(-rate * t)) + rng.normal(0, 0.02, (n_points, wells))
+
+def single_sheet(rng, plate):
+    """单通道版式（layout.SINGLE）：第 14–23 行为 T1–T10（AU 取第 14 行，DR 取第 23 行）"""
+    values = rng.normal(0, 0.05, (row_window(SINGLE)[1] + 1 + TRAILING_ROWS, plate))
+    start, end = SINGLE['time_rows']
+    values[start:end + 1] = kinetic_curves(rng, end - start + 1, plate)
+    return values
+
+def dual_sheet(rng, plate):
+    """双通道版式（layout.DUAL）：各模块的 T1–T6 行、DR 行以及第 51 行 AU"""
+    values = rng.normal(0, 0.05, (row_window(DUAL)[1] + 1 + TRAILING_ROWS, plate))
+    for start, end, dr_row in DUAL['modules'].values():
+        curves = kinetic_curves(rng, end - start + 1, plate)
+        values[start:end + 1] = curves
+        values[dr_row] = (curves[-1] - curves[0]) / curves[0]
+    values[DUAL['au_row']] = rng.uniform(0, 50, plate)
+    return values
+
+SHEET_BUILDERS = {'single': single_sheet, 'dual': dual_sheet}
+
+def make_workbook(path, mode='dual', n_sheets=1, wells=None, seed=0, plate=WELL_COUNT):
+    """
+    生成仿真酶标仪导出文件：n_sheets 个 sheet，名称形如 P001-DrugA；
+    plate 孔板的数值自 C 列起横向排列（96 孔板为 C..CT），只填充前 wells 个孔（默认全部，其余留空），
+    A/B 列为行标签。
+    """
+    if plate not in PLATE_FORMATS:
+        raise ValueError(f"plate must be one of: {', '.join(map(str, PLATE_FORMATS))}")
+    wells = plate if wells is None else wells
+    if not 0 < wells <= plate:
+        raise ValueError(f"wells must be between 1 and {plate}")
+    rng = np.random.default_rng(seed)
+    wb = Workbook(write_only=True)
+    for i in range(n_sheets):
+        ws = wb.create_sheet(f"P{i + 1:03d}-{TREATMENTS[i % len(TREATMENTS)]}")
+        values = SHEET_BUILDERS[mode](rng, plate).round(4)
+        ws.append(['Synthetic plate reader export', f'mode={mode}'])
+        for r in range(1, len(values)):
+            row = values[r].tolist()
+            ws.append([f'Row {r + 1}', None] + row[:wells] + [None] * (plate - wells))
+    wb.save(path)
+    return path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic plate reader workbook.')
+    parser.add_argument('output')
+    parser.add_argument('-m', '--mode', choices=sorted(SHEET_BUILDERS), default='dual')
+    parser.add_argument('-n', '--sheets', type=int, default=1)
+    parser.add_argument('-p', '--plate', type=int, choices=sorted(PLATE_FORMATS), default=WELL_COUNT,
+                        help='plate format (default: 96)')
+    parser.add_argument('-w', '--wells', type=int, default=None,
+                        help='number of filled wells (default: the whole plate)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    make_workbook(args.output, args.mode, args.sheets, args.wells, args.seed, args.plate)
+    print(f"✅ {os.path.abspath(args.output)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import io
+import os
+from contextlib import closing
+
+from core import dual_core_gui_adapter, single_core
+from core.cache import iter_sheet_blocks
+from core.excel_writer import write_formatted_workbook
+from core.fileio import atomic_path, read_source
+from core.heatmap import render_tables
+from core.progress import check_cancel, timed_iter
+from core.sniff import resolve_layout, sniff, sniff_mode
+from core.store import record_results
+
+PIPELINES = {
+    'single': single_core,
+    'dual': dual_core_gui_adapter,
+}
+
+def resolve_pipeline(source, mode='auto', template=None):
+    """
+    返回 (mode, 对应的处理模块)；mode='auto' 时按版式判断（不使用模板缓存），
+    template 为已有的 sniff 结果时不再读取输入
+    """
+    if mode == 'auto':
+        mode = sniff_mode(source, cache=False, template=template)
+    if mode not in PIPELINES:
+        raise ValueError(f"Unknown mode '{mode}', expected one of: auto, {', '.join(PIPELINES)}")
+    return mode, PIPELINES[mode]
+
+def read_tables(source, mode='auto', workers=None, cache=None, cancel=None, metrics=None,
+                kinetics=False, wells=None, template=None):
+    """
+    解析并提取结果表，返回 {输出文件名: DataFrame}（顺序与文件输出一致），
+    除 cache 指定的解析缓存外不写任何文件（不使用模板缓存，见 core.sniff）；
+    kinetics=True 时加入动力学参数列（见 core.kinetics），wells 为 None 时自动判断孔板规格。
+    template 为已有的 sniff 结果（见 process）时不再检查输入。
+    """
+    source = read_source(source)
+    template = template or sniff(source, cache=False, plate=wells is None)
+    _, pipeline = resolve_pipeline(source, mode, template)
+    layout = resolve_layout(pipeline.LAYOUT, source, wells, template=template)
+    blocks = iter_sheet_blocks(source, layout, workers=workers, cache=cache)
+    sheet_names, sheet_blocks, sheet_markers = [], [], []
+    with closing(blocks):
+        for sheet_name, values, markers in timed_iter(metrics, 'parse', blocks):
+            check_cancel(cancel)
+            sheet_names.append(sheet_name)
+            sheet_blocks.append(values)
+            sheet_markers.append(markers)
+    check_cancel(cancel)
+    return dict(pipeline.build_tables(sheet_names, sheet_blocks, metrics, sheet_markers,
+                                      kinetics=kinetics, layout=layout))
+
+def render_workbooks(tables, mode, metrics=None):
+    """将 read_tables 的结果渲染为带格式与色阶的 xlsx，返回 {输出文件名: bytes}"""
+    pipeline = PIPELINES[mode]
+    workbooks = {}
+    for filename, df in tables.items():
+        buffer = io.BytesIO()
+        write_formatted_workbook(df, buffer, pipeline.table_gradients(filename, df),
+                                 pipeline.DECIMAL_PLACES, metrics=metrics)
+        workbooks[filename] = buffer.getvalue()
+    return workbooks
+
+def process(source, mode='auto', workbooks=False, workers=None, cache=None, cancel=None,
+            metrics=None, kinetics=False, wells=None):
+    """
+    一次完成解析与提取，返回 {'mode': ..., 'tables': {...}, 'workbooks': {...}}；
+    workbooks=False 时不生成 xlsx（'workbooks' 为空字典）。
+    """
+    source = read_source(source)
+    template = sniff(source, cache=False, plate=wells is None)
+    mode, _ = resolve_pipeline(source, mode, template)
+    tables = read_tables(source, mode, workers, cache, cancel, metrics, kinetics, wells, template)
+    return {
+        'mode': mode,
+        'tables': tables,
+        'workbooks': render_workbooks(tables, mode, metrics) if workbooks else {},
+    }
+
+def save_outputs(workbooks, output_dir):
+    """将内存中的文件 {文件名: bytes} 原子写入 output_dir，返回路径列表"""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for filename, data in workbooks.items():
+        path = os.path.join(output_dir, filename)
+        with atomic_path(path) as tmp_path, open(tmp_path, 'wb') as f:
+            f.write(data)
+        paths.append(path)
+    return paths
+
+def save_heatmaps(tables, mode, output_dir, wells=96, workers=None, metrics=None):
+    """将 read_tables 的结果按处理模块的 HEATMAPS 渲染为板图 PNG（见 core.heatmap），返回路径列表"""
+    return render_tables(list(tables.items()), PIPELINES[mode].HEATMAPS, output_dir, wells,
+                         workers, metrics)
+
+def save_results(tables, mode, source, store=True, metrics=None):
+    """
+    将 read_tables 的结果写入结果库（见 core.store），source 为记录用的输入文件名或路径，
+    同名来源的旧结果被替换；store 为 True（默认位置）、数据库路径或 ResultStore。返回 run_id。
+    """
+    return record_results(store, source, mode, list(tables.items()), metrics=metrics)
@@ -0,0 +1,101 @@
+import multiprocessing
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# 工作进程向界面汇报进度的最短间隔（秒）；期间的 on_step 合并为一条消息
+STEP_INTERVAL = 0.03
+
+_messages = None
+_cancel = None
+
+def preload():
+    """导入处理流程的全部依赖（pandas、openpyxl、NumPy 与两个处理模块），返回耗时（秒）"""
+    start = time.perf_counter()
+    from core import dual_core_gui_adapter, single_core  # noqa: F401
+    return time.perf_counter() - start
+
+def _init_worker(messages, cancel):
+    global _messages, _cancel
+    _messages, _cancel = messages, cancel
+    preload()
+
+def _ready():
+    return True
+
+def run_job(job_id, mode, file_path, wells=None):
+    """
+    在工作进程中处理一个文件：先发送 ('total', 步数)，处理中发送 ('step', 步数)，
+    消息均带 job_id。wells 为 None 时自动判断孔板规格。返回生成的文件列表；取消时抛出 ProcessingCancelled。
+    """
+    from core import dual_core_gui_adapter, single_core
+    from core.sniff import sheet_names
+
+    pipeline = single_core if mode == 'single' else dual_core_gui_adapter
+    _messages.put((job_id, 'total', pipeline.count_steps(len(sheet_names(file_path)))))
+
+    pending, last = 0, time.perf_counter()
+    def on_step():
+        nonlocal pending, last
+        pending += 1
+        now = time.perf_counter()
+        if now - last >= STEP_INTERVAL:
+            _messages.put((job_id, 'step', pending))
+            pending, last = 0, now
+
+    try:
+        return pipeline.run_main(file_path, on_step=on_step, cancel=_cancel, wells=wells)
+    finally:
+        if pending:
+            _messages.put((job_id, 'step', pending))
+
+class WarmBackend:
+    """
+    常驻的单进程处理后端：创建时立即启动工作进程并在其中导入处理模块，
+    界面进程因此不必导入 pandas 等依赖，首次处理也无需等待导入。
+    进度经 poll() 取回；cancel() 通知正在运行的任务在 sheet 之间停止。
+    """
+
+    def __init__(self):
+        self._ctx = multiprocessing.get_context('spawn')
+        self._messages = self._ctx.Queue()
+        self._cancel = self._ctx.Event()
+        self._job_id = 0
+        self._start()
+
+    def _start(self):
+        self._pool = ProcessPoolExecutor(max_workers=1, mp_context=self._ctx,
+                                         initializer=_init_worker,
+                                         initargs=(self._messages, self._cancel))
+        self.warm = self._pool.submit(_ready)  # 完成时表示导入已结束
+
+    def submit(self, mode, file_path, wells=None):
+        """提交一个处理任务，返回 Future（结果为生成的文件列表）；工作进程异常退出后自动重启"""
+        self.poll()  # 丢弃上一个任务残留的进度消息
+        self._cancel.clear()
+        self._job_id += 1
+        try:
+            return self._pool.submit(run_job, self._job_id, mode, file_path, wells)
+        except BrokenProcessPool:
+            self._pool.shutdown(wait=False)
+            self._start()
+            return self._pool.submit(run_job, self._job_id, mode, file_path, wells)
+
+    def poll(self):
+        """取出当前任务已发送的进度消息 [(kind, value), ...]，不阻塞"""
+        messages = []
+        while True:
+            try:
+                job_id, kind, value = self._messages.get_nowait()
+            except queue.Empty:
+                return messages
+            if job_id == self._job_id:
+                messages.append((kind, value))
+
+    def cancel(self):
+        self._cancel.set()
+
+    def shutdown(self):
+        self._cancel.set()
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,272 @@
+import argparse
+import fnmatch
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core import dual_core_gui_adapter, single_core
+from core._version import __version__
+from core.cache import DEFAULT_CACHE_DIR, PlateCache
+from core.columnar import OUTPUT_FORMATS, check_output_format
+from core.layout import PLATE_FORMATS
+from core.progress import RunMetrics, profile_call
+from core.sniff import sniff, sniff_mode
+from core.store import DEFAULT_STORE_PATH
+
+RUNNERS = {
+    'single': single_core.run_main,
+    'dual': dual_core_gui_adapter.run_main,
+}
+MODES = sorted(RUNNERS) + ['auto']
+
+# 扫描目录时跳过的已生成结果文件
+OUTPUT_NAMES = {
+    'Kinetics.xlsx',
+    dual_core_gui_adapter.OUTPUT_FILE_DR,
+    *dual_core_gui_adapter.MODULE_FILES.values(),
+    *(filename for _, _, filename in dual_core_gui_adapter.RATIO_TABLES.values()),
+}
+
+def is_input_workbook(name):
+    """跳过 Excel 锁文件（~$）、隐藏文件与写入中的临时文件（.），以及已生成的结果文件"""
+    return (name.lower().endswith('.xlsx') and not name.startswith(('~$', '.'))
+            and name not in OUTPUT_NAMES)
+
+def parse_rule(text):
+    """'PATTERN=MODE' → (pattern, mode)，如 '*-dual*.xlsx=dual'"""
+    pattern, sep, mode = text.rpartition('=')
+    if not sep or not pattern or mode not in RUNNERS:
+        raise argparse.ArgumentTypeError(
+            f"expected PATTERN=MODE with MODE one of {', '.join(sorted(RUNNERS))}, got '{text}'")
+    return pattern, mode
+
+def resolve_mode(path, mode='auto', rules=(), template=None):
+    """
+    文件名匹配的第一条规则优先；否则使用 mode，'auto' 时按版式判断
+    （template 为已有的 sniff 结果时不再读取输入）
+    """
+    name = os.path.basename(path).lower()
+    for pattern, rule_mode in rules:
+        if fnmatch.fnmatch(name, pattern.lower()):
+            return rule_mode
+    return sniff_mode(path, template=template) if mode == 'auto' else mode
+
+def collect_inputs(paths, recursive=False):
+    """展开文件与目录为待处理的 .xlsx 列表（去重并保持顺序）"""
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            if recursive:
+                found = [os.path.join(root, name)
+                         for root, _, names in os.walk(path) for name in names]
+            else:
+                found = [os.path.join(path, name) for name in os.listdir(path)]
+            inputs.extend(sorted(f for f in found
+                                 if os.path.isfile(f) and is_input_workbook(os.path.basename(f))))
+        elif os.path.isfile(path):
+            inputs.append(path)
+        else:
+            raise FileNotFoundError(f"No such file or directory: '{path}'")
+
+    unique = []
+    for path in map(os.path.abspath, inputs):
+        if path not in unique:
+            unique.append(path)
+    return unique
+
+def output_dirs_for(inputs, output_root=None):
+    """每个输入文件对应一个以文件名命名的输出目录，同名时追加序号"""
+    dirs, used = [], set()
+    for path in inputs:
+        root = output_root or os.path.dirname(path)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        candidate, n = os.path.join(root, stem), 1
+        while candidate in used:
+            n += 1
+            candidate = os.path.join(root, f"{stem}_{n}")
+        used.add(candidate)
+        dirs.append(candidate)
+    return dirs
+
+def process_file(path, mode, output_dir, sheet_workers=None, cache=None,
+                 write_metrics=False, profile=False, output_format='xlsx', report=None,
+                 incremental=False, rules=(), streaming=False, kinetics=False, wells=None,
+                 heatmaps=False, store=None):
+    """
+    处理单个文件并记录耗时；异常被捕获为失败结果而不中断整个批次。
+    mode 可为 'auto'，与 rules 一起由 resolve_mode 决定实际模式。
+    write_metrics / profile 为 True 时在输出目录写入 metrics.json / profile.prof
+    """
+    start = time.perf_counter()
+    result = {'path': path, 'mode': mode, 'output_dir': output_dir, 'files': [], 'sheets': 0}
+    metrics = RunMetrics()
+    kwargs = dict(workers=sheet_workers, output_dir=output_dir, cache=cache, metrics=metrics,
+                  output_format=output_format, report=report, incremental=incremental,
+                  streaming=streaming, kinetics=kinetics, wells=wells, heatmaps=heatmaps,
+                  store=store)
+    try:
+        # 只检查一次输入：版式、sheet 列表与孔板规格供 resolve_mode 与处理模块共用
+        template = kwargs['template'] = sniff(path, plate=wells is None)
+        mode = result['mode'] = resolve_mode(path, mode, rules, template)
+        result['sheets'] = len(template['sheets'])
+        if profile:
+            os.makedirs(output_dir, exist_ok=True)
+            result['files'] = profile_call(os.path.join(output_dir, 'profile.prof'),
+                                           RUNNERS[mode], path, **kwargs)
+        else:
+            result['files'] = RUNNERS[mode](path, **kwargs)
+        result['ok'] = True
+    except Exception as e:
+        result['ok'] = False
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    result['stages'] = metrics.finish().stages
+    if write_metrics and result['ok']:
+        metrics.to_json(os.path.join(output_dir, 'metrics.json'))
+    return result
+
+def run_batch(inputs, mode, jobs=None, output_root=None, sheet_workers=None, cache=None,
+              write_metrics=False, profile=False, output_format='xlsx', report=None,
+              incremental=False, rules=(), streaming=False, kinetics=False, wells=None,
+              heatmaps=False, store=None, on_result=None):
+    """
+    在进程池中按文件调度处理，jobs 为并发文件数（默认 CPU 核数）。
+    每完成一个文件调用 on_result(result)；返回结果列表，顺序与 inputs 一致。
+    """
+    output_dirs = output_dirs_for(inputs, output_root)
+    jobs = jobs or os.cpu_count() or 1
+    options = dict(sheet_workers=sheet_workers, cache=cache, write_metrics=write_metrics,
+                   profile=profile, output_format=output_format, report=report,
+                   incremental=incremental, rules=rules, streaming=streaming, kinetics=kinetics,
+                   wells=wells, heatmaps=heatmaps, store=store)
+
+    if jobs <= 1 or len(inputs) <= 1:
+        results = []
+        for path, output_dir in zip(inputs, output_dirs):
+            results.append(process_file(path, mode, output_dir, **options))
+            if on_result: on_result(results[-1])
+        return results
+
+    results = [None] * len(inputs)
+    with ProcessPoolExecutor(max_workers=min(jobs, len(inputs))) as pool:
+        futures = {pool.submit(process_file, path, mode, output_dir, **options): i
+                   for i, (path, output_dir) in enumerate(zip(inputs, output_dirs))}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if on_result: on_result(results[futures[future]])
+    return results
+
+def format_result(result):
+    name = os.path.basename(result['path'])
+    if not result['ok']:
+        return f"❌ {name}  {result['seconds']:.2f}s  {result['error']}"
+    rate = result['sheets'] / result['seconds'] if result['seconds'] else 0.0
+    return (f"✅ {name}  {result['sheets']} sheets  {result['seconds']:.2f}s  "
+            f"{rate:.1f} sheets/s  -> {result['output_dir']}")
+
+def format_summary(results, wall_seconds):
+    done = [r for r in results if r['ok']]
+    sheets = sum(r['sheets'] for r in done)
+    busy = sum(r['seconds'] for r in results)
+    totals = RunMetrics()
+    for r in done:
+        totals.merge(r['stages'])
+    lines = [
+        f"Files: {len(done)} ok, {len(results) - len(done)} failed, {len(results)} total",
+        f"Sheets: {sheets}",
+        f"Wall time: {wall_seconds:.2f}s (sum of per-file time {busy:.2f}s)",
+    ]
+    if wall_seconds:
+        lines.append(f"Throughput: {len(done) / wall_seconds:.2f} files/s, "
+                     f"{sheets / wall_seconds:.1f} sheets/s")
+    if totals.stages:
+        lines.append("Stage time (summed over files):")
+        lines.append(totals.summary())
+    return "\n".join(lines)
+
+def add_processing_options(parser, default_mode='single'):
+    """批处理与 watch 共用的处理选项"""
+    parser.add_argument('-m', '--mode', choices=MODES, default=default_mode,
+                        help=f"processing mode; 'auto' picks it from the sheet layout "
+                             f"(default: {default_mode})")
+    parser.add_argument('--rule', action='append', type=parse_rule, default=[],
+                        metavar='PATTERN=MODE',
+                        help="use MODE for file names matching PATTERN, e.g. '*dual*=dual' "
+                             "(repeatable, first match wins, overrides --mode)")
+    parser.add_argument('-o', '--output-root',
+                        help='write per-input output folders here instead of next to each input')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of files processed in parallel (default: CPU count)')
+    parser.add_argument('--sheet-workers', type=int, default=None,
+                        help='process-pool size for sheets within each file (default: serial)')
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='xlsx',
+                        help='output format (default: xlsx); parquet/feather need pyarrow')
+    parser.add_argument('--report', action='store_true',
+                        help='with a columnar --format, also write the formatted xlsx reports')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only process sheets added or changed since the last run '
+                             'and update the existing outputs in place')
+    parser.add_argument('--streaming', action='store_true',
+                        help='write outputs chunk by chunk so memory does not grow with sheet count')
+    parser.add_argument('--kinetics', action='store_true',
+                        help='add slope, time-to-half-max and AUC columns computed from the '
+                             'time points (and 485/420 ratio tables in dual mode)')
+    parser.add_argument('-w', '--wells', type=int, choices=sorted(PLATE_FORMATS), default=None,
+                        help='plate format (default: detected from the first sheet)')
+    parser.add_argument('--heatmaps', action='store_true',
+                        help='render plate-map PNGs of the DR/AU values and the last time point, '
+                             'plus a contact sheet per value, into heatmaps/')
+    parser.add_argument('--store', nargs='?', const=True, default=None, metavar='DB',
+                        help='also save the result tables to a local SQLite database for '
+                             f'cross-run queries (default: {DEFAULT_STORE_PATH})')
+    parser.add_argument('--cache', action='store_true',
+                        help='reuse parsed plate data from the on-disk cache')
+    parser.add_argument('--cache-dir', default=None,
+                        help=f'cache location (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--metrics', action='store_true',
+                        help='write per-stage timings to metrics.json in each output folder')
+    parser.add_argument('--profile', action='store_true',
+                        help='write a cProfile dump to profile.prof in each output folder')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='search directories recursively')
+    parser.add_argument('--version', action='version', version=f'mProcess {__version__}')
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m core',
+        description='Batch-process microplate reader exports without the GUI.')
+    parser.add_argument('inputs', nargs='+', help='.xlsx files or directories containing them')
+    add_processing_options(parser)
+    return parser
+
+def open_cache(args):
+    return PlateCache(args.cache_dir) if args.cache or args.cache_dir else None
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        inputs = collect_inputs(args.inputs, args.recursive)
+    except FileNotFoundError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    if not inputs:
+        print("⚠️ No .xlsx files found.", file=sys.stderr)
+        return 2
+    try:
+        check_output_format(args.format)
+    except ImportError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+    print(f"🚀 {len(inputs)} file(s), mode={args.mode}")
+    start = time.perf_counter()
+    results = run_batch(inputs, args.mode, jobs=args.jobs, output_root=args.output_root,
+                        sheet_workers=args.sheet_workers, cache=open_cache(args),
+                        write_metrics=args.metrics, profile=args.profile,
+                        output_format=args.format, report=args.report,
+                        incremental=args.incremental, rules=args.rule, streaming=args.streaming,
+                        kinetics=args.kinetics, wells=args.wells, heatmaps=args.heatmaps,
+                        store=args.store, on_result=lambda r: print(format_result(r), flush=True))
+    print(format_summary(results, time.perf_counter() - start))
+    return 0 if all(r['ok'] for r in results) else 1
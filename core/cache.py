@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from core.fileio import atomic_path
+from core.layout import block_reader, block_shape, col_window, row_window
+from core.parallel import iter_sheets
+
+CACHE_FORMAT = 2
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'mprocess')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+def file_digest(source, chunk_size=1 << 20):
+    """source 为路径或 bytes"""
+    if isinstance(source, bytes):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class PlateCache:
+    """
+    解析结果的本地磁盘缓存：键为输入文件内容哈希 + 版式参数，
+    值为各 sheet 行窗口的 float 数组及其非数值单元格（.npz）。按最近使用时间淘汰，总大小不超过 max_bytes。
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or os.environ.get('MPROCESS_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes
+
+    def key(self, source, layout):
+        params = json.dumps({'format': CACHE_FORMAT, 'layout': layout}, sort_keys=True)
+        return hashlib.sha256(f"{file_digest(source)}:{params}".encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def load(self, key):
+        """命中时返回 [(sheet_name, values, markers), ...]，未命中或缓存文件损坏时返回 None"""
+        path = self.path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                names, blocks = data['sheet_names'].tolist(), data['blocks']
+                markers = json.loads(str(data['markers']))
+        except (OSError, ValueError, KeyError):
+            return None
+        os.utime(path)
+        return [(name, values, [tuple(cell) for cell in cells])
+                for name, values, cells in zip(names, blocks, markers)]
+
+    def store(self, key, sheet_names, blocks, shape, markers):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        stacked = np.stack(blocks) if blocks else np.empty((0, *shape))
+        with atomic_path(self.path(key)) as tmp_path, open(tmp_path, 'wb') as f:
+            np.savez(f, sheet_names=np.array(sheet_names, dtype=str), blocks=stacked,
+                     markers=np.array(json.dumps(markers, ensure_ascii=False)))
+        self.evict()
+
+    def evict(self):
+        """删除最久未使用的缓存文件，直到总大小不超过 max_bytes"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npz') and not name.startswith('.'):  # 跳过写入中的临时文件
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.npz'):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+def resolve_cache(cache):
+    """cache 参数可为 None/False（不缓存）、True（默认目录）、目录路径或 PlateCache 实例"""
+    if not cache:
+        return None
+    if cache is True:
+        return PlateCache()
+    if isinstance(cache, (str, os.PathLike)):
+        return PlateCache(os.fspath(cache))
+    return cache
+
+def iter_sheet_blocks(source, layout, workers=None, cache=None):
+    """
+    依次返回 (sheet_name, values, markers)，values 为版式 layout（见 core.layout）的行窗口与孔位列的
+    float 数组，markers 为其中的非数值单元格（见 sheet_reader.text_cells）。
+    命中缓存时完全跳过 xlsx 解析；否则解析后写入缓存。
+    """
+    cache = resolve_cache(cache)
+    if cache is not None:
+        key = cache.key(source, {'rows': list(row_window(layout)), 'cols': list(col_window(layout)),
+                                 **layout})
+        cached = cache.load(key)
+        if cached is not None:
+            yield from cached
+            return
+
+    names, blocks, markers = [], [], []
+    for sheet_name, values, cells in iter_sheets(block_reader(layout), source, workers=workers):
+        if cache is not None:
+            names.append(sheet_name)
+            blocks.append(values)
+            markers.append(cells)
+        yield sheet_name, values, cells
+
+    if cache is not None:
+        cache.store(key, names, blocks, block_shape(layout), markers)
@@ -0,0 +1,178 @@
+import importlib.util
+import os
+import shutil
+
+import pandas as pd
+
+from core.engine import numeric_values
+from core.fileio import atomic_path, temp_path
+from core.progress import file_size, timed_stage
+
+# 列式输出格式 → 扩展名；'xlsx' 为默认的格式化报表
+FORMATS = {
+    'parquet': '.parquet',
+    'feather': '.feather',
+    'csv': '.csv',
+}
+OUTPUT_FORMATS = ('xlsx',) + tuple(FORMATS)
+
+def check_output_format(output_format):
+    """校验输出格式；parquet/feather 需要可选依赖 pyarrow"""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}', "
+                         f"expected one of: {', '.join(OUTPUT_FORMATS)}")
+    if output_format in ('parquet', 'feather') and importlib.util.find_spec('pyarrow') is None:
+        raise ImportError(f"{output_format} output requires pyarrow (pip install pyarrow)")
+
+def wants_report(output_format, report=None):
+    """xlsx 格式始终生成报表；列式格式默认不生成，report=True 时在列式文件之后补充生成"""
+    return output_format == 'xlsx' or bool(report)
+
+def table_path(xlsx_path, output_format):
+    return os.path.splitext(xlsx_path)[0] + FORMATS[output_format]
+
+def write_table(df, path, output_format):
+    return save_table(numeric_values(df), path, output_format)
+
+def save_table(df, path, output_format):
+    """原样写出 df；标签列从 CSV 读回后为文本列，不能再经 numeric_values 转换"""
+    with atomic_path(path) as target:
+        if output_format == 'parquet':
+            df.to_parquet(target, index=False)
+        elif output_format == 'feather':
+            df.reset_index(drop=True).to_feather(target)
+        else:
+            df.to_csv(target, index=False)
+    return path
+
+def write_tables(tables, output_format, on_step=None, metrics=None):
+    """
+    以列式格式写出各表（保留数值与分类列的类型，非数值标记记为缺失值），tables: [(df, xlsx_path), ...]，
+    文件名与对应的 xlsx 报表相同、仅扩展名不同。每写出一个表触发一次 on_step。
+    """
+    paths = []
+    for df, xlsx_path in tables:
+        path = table_path(xlsx_path, output_format)
+        with timed_stage(metrics, 'write'):
+            write_table(df, path, output_format)
+        if metrics is not None:
+            metrics.add('write', bytes=file_size(path))
+        paths.append(path)
+        if on_step: on_step()
+    return paths
+
+def read_table(path, output_format):
+    if output_format == 'parquet':
+        return pd.read_parquet(path)
+    if output_format == 'feather':
+        return pd.read_feather(path)
+    return pd.read_csv(path, float_precision='round_trip', keep_default_na=False,
+                       na_values=[''])
+
+def patch_table(df, path, output_format, row_positions):
+    """
+    按位置覆盖或追加已有列式表的数据行（row_positions 为 0-based 位置）。
+    CSV 仅追加时复制原文件并在副本末尾写入，不重新解析；其余情况读入后整表重写，
+    分类列按原有顺序合并新增的类别。两种情况均原子替换 path，中断时原文件保持不变。
+    """
+    df = numeric_values(df)
+    row_positions = list(row_positions)
+    old_rows = None
+    if output_format == 'csv':
+        with open(path, 'rb') as f:
+            old_rows = sum(1 for _ in f) - 1
+    if old_rows is not None and row_positions == list(range(old_rows, old_rows + len(df))):
+        with atomic_path(path) as tmp_path:
+            shutil.copyfile(path, tmp_path)
+            df.to_csv(tmp_path, mode='a', header=False, index=False)
+        return path
+
+    old = read_table(path, output_format)
+    appended = [i for i, pos in enumerate(row_positions) if pos >= len(old)]
+    replaced = [i for i, pos in enumerate(row_positions) if pos < len(old)]
+    if replaced:
+        numeric = df.select_dtypes(include='number').columns
+        rows = [row_positions[i] for i in replaced]
+        old.loc[rows, numeric] = df.iloc[replaced][numeric].to_numpy()
+    if appended:
+        new = df.iloc[appended].reset_index(drop=True)
+        table = pd.concat([old, new], ignore_index=True)
+        for col in old.columns:
+            if isinstance(old[col].dtype, pd.CategoricalDtype):
+                categories = old[col].cat.categories.union(new[col].cat.categories, sort=False)
+                table[col] = pd.Categorical(table[col], categories=categories)
+        old = table
+    return save_table(old, path, output_format)
+
+class TableStream:
+    """
+    逐块追加写出列式表：CSV 追加到文件末尾，Parquet 每块一个 row group，Feather 每块一个 record batch。
+    分类列的类别按出现顺序累积，使各块的字典保持一致（Feather 只接受字典增量）。
+    写入同目录下的临时文件，close 时原子替换 path；abort 时丢弃，原有文件保持不变。
+    columns 为未追加任何块时写出的空表的列名。
+    """
+
+    def __init__(self, path, output_format, columns=()):
+        self.path = path
+        self.output_format = output_format
+        self.columns = list(columns)
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+        self._categories = {}
+        self._target = temp_path(path)
+
+    def _extend_categories(self, df):
+        df = df.copy(deep=False)
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                seen = self._categories.get(col)
+                categories = df[col].cat.categories if seen is None else \
+                    seen.union(df[col].cat.categories, sort=False)
+                df[col] = df[col].cat.set_categories(categories)
+                self._categories[col] = categories
+        return df
+
+    def append(self, df):
+        df = numeric_values(df)
+        if self.output_format == 'csv':
+            df.to_csv(self._target, mode='a' if self.rows else 'w', header=not self.rows,
+                      index=False)
+            self.rows += len(df)
+            return
+
+        import pyarrow as pa
+        table = pa.Table.from_pandas(self._extend_categories(df), preserve_index=False)
+        if self._writer is None:
+            fields = [field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+                      if pa.types.is_dictionary(field.type) else field for field in table.schema]
+            self._schema = pa.schema(fields, metadata=table.schema.metadata)
+            if self.output_format == 'parquet':
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self._target, self._schema)
+            else:
+                import pyarrow.ipc as ipc
+                self._writer = ipc.new_file(self._target, self._schema,
+                                            options=ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+        self._writer.write_table(table.cast(self._schema))
+        self.rows += len(df)
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def close(self):
+        """未追加过任何块时（临时文件尚未创建）写出一个空表"""
+        self._close_writer()
+        if not os.path.exists(self._target):
+            save_table(pd.DataFrame(columns=self.columns), self._target, self.output_format)
+        os.replace(self._target, self.path)
+        return self.path
+
+    def abort(self):
+        try:
+            self._close_writer()
+        finally:
+            if os.path.exists(self._target):
+                os.remove(self._target)
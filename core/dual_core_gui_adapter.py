@@ -1,7 +1,20 @@
 import os
-import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.formatting.rule import ColorScaleRule
+from contextlib import closing
+from functools import partial
+import numpy as np
+from core.excel_writer import color_scale_rule, workbook_steps, write_workbooks
+from core.cache import iter_sheet_blocks
+from core.heatmap import DIVERGING, SEQUENTIAL, render_tables
+from core.columnar import check_output_format, wants_report, write_tables
+from core.progress import check_cancel, file_size, timed_iter, timed_stage
+from core.engine import (assemble, label_columns, place_markers, round_by_value, round_sheets,
+                         round_values, row_values, stack_sheets, time_block)
+from core.incremental import update_outputs
+from core.kinetics import METRIC_COLUMNS, kinetic_metrics, ratio
+from core.layout import DUAL, block_shape, row_window, well_names
+from core.sniff import resolve_layout
+from core.store import record_results
+from core.streaming import check_run_options, stream_outputs
 
 # 输出文件名定义
 OUTPUT_FILE_485 = 'DR485-Kinetics.xlsx'
@@ -10,187 +23,207 @@ OUTPUT_FILE_DF485 = 'DF485-Kinetics.xlsx'
 OUTPUT_FILE_DF420 = 'DF420-Kinetics.xlsx'
 OUTPUT_FILE_DR = 'DR.xlsx'
 
-MODULES = {
-    'DR485': (41, 46, 48, OUTPUT_FILE_485),
-    'DR420': (61, 66, 68, OUTPUT_FILE_420),
-    'DF485': (126, 131, 132, OUTPUT_FILE_DF485),
-    'DF420': (145, 150, 151, OUTPUT_FILE_DF420),
+MODULE_FILES = {
+    'DR485': OUTPUT_FILE_485,
+    'DR420': OUTPUT_FILE_420,
+    'DF485': OUTPUT_FILE_DF485,
+    'DF420': OUTPUT_FILE_DF420,
 }
-
-def generate_wells():
-    return [f'{r}{c:02d}' for r in 'ABCDEFGH' for c in range(1, 13)]
-
-def extract_module(df, time_start, time_end, dr_row, label):
-    block = df.iloc[time_start:time_end + 1, 2:98].T.reset_index(drop=True)
-    block.columns = [f'T{i+1}' for i in range(6)]
-    dr = df.iloc[dr_row, 2:98].T.reset_index(drop=True).rename(label)
-    au = df.iloc[50, 2:98].T.reset_index(drop=True).rename('AU')
-    merged = pd.concat([block, dr, au], axis=1)
-    return merged
-
-def enrich_dataframe(df):
-    df.insert(0, 'Plate', df['Source'].str.split('-').str[0])
-    df['Treatment'] = df['Source'].str.split('-').str[1]
-
-    wells_96 = generate_wells()
-    df['Sample'] = None
-
-    for source, idxs in df.groupby('Source').groups.items():
-        plate = source.split('-')[0]
-        wells = wells_96[:len(idxs)]
-        df.loc[idxs, 'Sample'] = [f"{plate}-{w}" for w in wells]
-
-    cols = df.columns.tolist()
-    cols.insert(1, cols.pop(cols.index('Sample')))
-    cols.append(cols.pop(cols.index('Treatment')))
-    return df[cols]
-
-def process_and_save(data, label, output_file, on_step=None):
-    final_df = pd.concat(data, ignore_index=True)
-    numeric_cols = final_df.select_dtypes(include='number').columns.tolist()
-    final_df[numeric_cols] = final_df[numeric_cols].astype(float).round(2)
-
-    final_df = enrich_dataframe(final_df)
-
-    # ✅ 添加 ID 列
-    final_df.insert(0, 'ID', range(1, len(final_df) + 1))
-
-    final_df.to_excel(output_file, index=False)
-    if on_step: on_step()
-
-    wb = load_workbook(output_file)
-    ws = wb.active
-    col_index_map = {col: idx + 1 for idx, col in enumerate(final_df.columns) if col in numeric_cols}
-
-    for row in ws.iter_rows(min_row=2):
-        for col_idx in col_index_map.values():
-            cell = row[col_idx - 1]
-            if isinstance(cell.value, (int, float)):
-                cell.number_format = '0.00'
-    wb.save(output_file)
-    if on_step: on_step()
-
-    apply_column_gradient(output_file, target_columns=['AU'], mode='two-color',
-                          start_color='FFFFFF', end_color='4169E1')
-    if on_step: on_step()
-
-    apply_column_gradient(output_file, target_columns=[f'T{i+1}' for i in range(6)],
-                          mode='three-color')
-    if on_step: on_step()
-
-    round_numeric_cells_in_excel(output_file)
-    if on_step: on_step()
-
-def apply_column_gradient(file_path, target_columns,
-                          mode='three-color', start_color='00FF00',
-                          mid_color='FFFFFF', end_color='FF69B4'):
-    wb = load_workbook(file_path)
-    ws = wb.active
-    header = [cell.value for cell in ws[1]]
-
-    for col_name in target_columns:
-        if col_name not in header:
-            continue
-        col_index = header.index(col_name) + 1
-        col_letter = ws.cell(row=1, column=col_index).column_letter
-        col_range = f"{col_letter}2:{col_letter}{ws.max_row}"
-
-        if mode == 'two-color':
-            rule = ColorScaleRule(start_type='min', start_color=start_color,
-                                  end_type='max', end_color=end_color)
-        else:
-            rule = ColorScaleRule(start_type='min', start_color=start_color,
-                                  mid_type='num', mid_value=0, mid_color=mid_color,
-                                  end_type='max', end_color=end_color)
-
-        ws.conditional_formatting.add(col_range, rule)
-
-    wb.save(file_path)
-
-def round_numeric_cells_in_excel(file_path, decimal_places=2):
-    wb = load_workbook(file_path)
-    ws = wb.active
-    for row in ws.iter_rows(min_row=2):
-        for cell in row:
-            if isinstance(cell.value, (int, float)):
-                cell.value = round(cell.value, decimal_places)
-                cell.number_format = f'0.{"0" * decimal_places}'
-    wb.save(file_path)
-
-def handle_processing(source_file, on_step=None):
-    excel = pd.ExcelFile(source_file)
-    data_dr = []
-    data_modules = {label: [] for label in MODULES}
-    output_folder = os.path.dirname(source_file)
-
-    for sheet in excel.sheet_names:
-        df = excel.parse(sheet_name=sheet, header=None)
-
-        for label, (start, end, dr_row, _) in MODULES.items():
-            module_data = extract_module(df, start, end, dr_row, label)
-            module_data['Source'] = sheet
-            data_modules[label].append(module_data)
+# kinetics=True 时额外输出的逐时间点比值表：(分子模块, 分母模块, 输出文件)
+RATIO_TABLES = {
+    'DR-Ratio': ('DR485', 'DR420', 'DR-Ratio-Kinetics.xlsx'),
+    'DF-Ratio': ('DF485', 'DF420', 'DF-Ratio-Kinetics.xlsx'),
+}
+DECIMAL_PLACES = 2
+# heatmaps=True 时渲染为板图的列及配色（与 module_gradients / dr_gradients 相同）：
+# 各模块表最后一个时间点，以及 DR 汇总表的各模块 DR 与 AU
+HEATMAPS = {**{filename: {'T6': DIVERGING} for filename in MODULE_FILES.values()},
+            OUTPUT_FILE_DR: {**{label: DIVERGING for label in MODULE_FILES}, 'AU': SEQUENTIAL}}
+
+# 默认（96 孔板）版式；孔板规格按输入文件判断，见 core.layout
+LAYOUT = DUAL
+
+def module_gradients():
+    return [
+        (['AU'], color_scale_rule('two-color', start_color='FFFFFF', end_color='4169E1'), False),
+        ([f'T{i+1}' for i in range(6)], color_scale_rule('three-color'), False),
+    ]
+
+def dr_gradients():
+    return [
+        (['DR485', 'DR420', 'DF485', 'DF420'], color_scale_rule('three-color'), False),
+        (['AU'], color_scale_rule('two-color', start_color='FFFFFF', end_color='4169E1'), False),
+    ]
+
+def extract_tables(cube, sheet_names, decimal_places=2, kinetics=False, layout=LAYOUT,
+                   sheet_markers=None):
+    """
+    由 (sheets, rows, wells) 数组一次性生成四个模块表（T1–T6 + DR + AU）
+    与 DR 汇总表，数值舍入到 decimal_places 位，尚未添加 ID 列；各行号取自版式 layout。
+    kinetics=True 时模块表在 AU 之后加入动力学参数列（METRIC_COLUMNS），
+    并按 RATIO_TABLES 生成逐时间点的 485/420 比值表（T1–T6 + AU + 动力学参数）。
+    sheet_markers 为各 sheet 的非数值单元格，按原文保留在模块表与 DR 汇总表中（见 engine.place_markers）。
+    数值只在此舍入一次：T1–T6 按列向量化舍入（含标记的 sheet 逐值舍入，见 engine.round_sheets）；
+    原流程按行取出的 DR 与 AU 为 object 列，写出后逐单元格 round，这里同样逐值舍入
+    （engine.round_by_value）。动力学参数与比值表按列舍入。孔位列只含数值或空单元格时与原流程一致。
+    """
+    first_row, _ = row_window(layout)
+    n_wells = layout['wells']
+    labels = label_columns(sheet_names, well_names(n_wells))
+    au = round_by_value(row_values(cube, layout['au_row'], first_row), decimal_places)
+    metric_columns = METRIC_COLUMNS if kinetics else []
+
+    tables, traces = {}, {}
+    for label, (start, end, dr_row) in layout['modules'].items():
+        traces[label] = time_block(cube, start, end, first_row)
+        metric_values = ([round_values(kinetic_metrics(traces[label]), decimal_places)]
+                         if kinetics else [])
+        values = np.column_stack([
+            round_sheets(traces[label], decimal_places, sheet_markers, n_wells),
+            round_by_value(row_values(cube, dr_row, first_row), decimal_places),
+            au,
+            *metric_values,
+        ])
+        columns = [f'T{i+1}' for i in range(end - start + 1)] + [label, 'AU'] + metric_columns
+        tables[label] = assemble(labels, ['Plate', 'Sample'], values, columns,
+                                 ['Source', 'Treatment'])
+        row_columns = {row: [f'T{row - start + 1}'] for row in range(start, end + 1)}
+        row_columns.setdefault(dr_row, []).append(label)
+        row_columns.setdefault(layout['au_row'], []).append('AU')
+        place_markers(tables[label], sheet_markers, row_columns, n_wells)
+
+    if kinetics:
+        for label, (numerator, denominator, _) in RATIO_TABLES.items():
+            ratios = ratio(traces[numerator], traces[denominator])
+            values = np.column_stack([round_values(ratios, decimal_places), au,
+                                      round_values(kinetic_metrics(ratios), decimal_places)])
+            columns = [f'T{i+1}' for i in range(ratios.shape[1])] + ['AU'] + metric_columns
+            tables[label] = assemble(labels, ['Plate', 'Sample'], values, columns,
+                                     ['Source', 'Treatment'])
+
+    dr_values = np.column_stack([row_values(cube, dr_row, first_row)
+                                 for _, _, dr_row in layout['modules'].values()])
+    dr_values = np.column_stack([round_by_value(dr_values, decimal_places), au])
+    tables['DR'] = assemble(labels, ['Plate', 'Sample'], dr_values,
+                            list(layout['modules']) + ['AU'], ['Source', 'Treatment'])
+    row_columns = {}
+    for label, (_, _, dr_row) in layout['modules'].items():
+        row_columns.setdefault(dr_row, []).append(label)
+    row_columns.setdefault(layout['au_row'], []).append('AU')
+    place_markers(tables['DR'], sheet_markers, row_columns, n_wells)
+    return tables
+
+def sheet_steps(layout=LAYOUT):
+    """每个 sheet 触发的 on_step 次数：每个模块 T1–T6 + DR + AU，DR 汇总表各模块的 DR + AU + Source"""
+    modules = layout['modules'].values()
+    return sum(end - start + 3 for start, end, _ in modules) + len(modules) + 2
+
+def count_steps(sheet_count, output_format='xlsx', report=None, kinetics=False, layout=LAYOUT):
+    """handle_processing 对给定 sheet 数触发的 on_step 总次数（用于驱动进度条）"""
+    steps = sheet_count * sheet_steps(layout)
+    n_tables = len(layout['modules']) + 1 + (len(RATIO_TABLES) if kinetics else 0)
+    if output_format != 'xlsx':
+        steps += n_tables
+    if wants_report(output_format, report):
+        steps += n_tables * workbook_steps(module_gradients())
+    return steps
+
+def build_tables(sheet_names, sheet_blocks, metrics=None, sheet_markers=None, kinetics=False,
+                 layout=LAYOUT):
+    """
+    由各 sheet 的行窗口数组生成 [(filename, df), ...]：四个模块表、（kinetics=True 时）比值表
+    与 DR 汇总表，均带连续 ID
+    """
+    with timed_stage(metrics, 'extract', sheets=len(sheet_names)):
+        cube = stack_sheets(sheet_blocks, block_shape(layout))
+        tables = extract_tables(cube, sheet_names, DECIMAL_PLACES, kinetics, layout, sheet_markers)
+
+    outputs = []
+    with timed_stage(metrics, 'enrich'):
+        for label, final_df in tables.items():
+            # ✅ 添加 ID 列
+            final_df.insert(0, 'ID', range(1, len(final_df) + 1))
+            if label in MODULE_FILES:
+                filename = MODULE_FILES[label]
+            elif label in RATIO_TABLES:
+                filename = RATIO_TABLES[label][2]
+            else:
+                filename = OUTPUT_FILE_DR
+            outputs.append((filename, final_df))
+    return outputs
+
+def table_gradients(filename, df):
+    """各输出表的色阶定义（上下限由 Excel 按列 min/max 计算，与数据无关）"""
+    return dr_gradients() if filename == OUTPUT_FILE_DR else module_gradients()
+
+def handle_processing(source_file, on_step=None, workers=None, output_folder=None, cache=None,
+                      cancel=None, metrics=None, output_format='xlsx', report=None,
+                      incremental=False, streaming=False, kinetics=False, wells=None,
+                      heatmaps=False, store=None, template=None):
+    check_output_format(output_format)
+    check_run_options(incremental, streaming, cache, heatmaps)
+    output_folder = output_folder or os.path.dirname(source_file)
+    layout = resolve_layout(LAYOUT, source_file, wells, template=template)
+    build = partial(build_tables, kinetics=kinetics, layout=layout)
+    if streaming:
+        if metrics is not None:
+            metrics.info.update(mode='dual', source=os.path.abspath(source_file), streaming=True)
+        return stream_outputs(source_file, output_folder or '.', layout, build, table_gradients,
+                              DECIMAL_PLACES, sheet_steps=sheet_steps(layout),
+                              on_step=on_step, workers=workers,
+                              cancel=cancel, metrics=metrics, output_format=output_format,
+                              report=report, store=store)
+    if incremental:
+        if kinetics:
+            layout = dict(layout, kinetics=True)
+        return update_outputs(source_file, output_folder, layout, build, table_gradients,
+                              DECIMAL_PLACES, sheet_steps=sheet_steps(layout),
+                              on_step=on_step, workers=workers, cache=cache, cancel=cancel,
+                              metrics=metrics, output_format=output_format, report=report,
+                              store=store)
+    if output_folder:
+        os.makedirs(output_folder, exist_ok=True)
+    if metrics is not None:
+        metrics.info.update(mode='dual', source=os.path.abspath(source_file))
+        metrics.add('parse', bytes=file_size(source_file))
+
+    blocks = iter_sheet_blocks(source_file, layout, workers=workers, cache=cache)
+    sheet_names, sheet_blocks, sheet_markers = [], [], []
+    with closing(blocks):
+        for sheet, values, markers in timed_iter(metrics, 'parse', blocks):
+            check_cancel(cancel)
+            sheet_names.append(sheet)
+            sheet_blocks.append(values)
+            sheet_markers.append(markers)
             if on_step:
-                for _ in range(8):  # T1–T6 + DR + AU
+                for _ in range(sheet_steps(layout)):
                     on_step()
+    check_cancel(cancel)
+    if metrics is not None:
+        metrics.info['sheet_count'] = len(sheet_names)
 
-        dr_vals = {
-            'DR485': df.iloc[48, 2:98].T.reset_index(drop=True).rename('DR485'),
-            'DR420': df.iloc[68, 2:98].T.reset_index(drop=True).rename('DR420'),
-            'DF485': df.iloc[132, 2:98].T.reset_index(drop=True).rename('DF485'),
-            'DF420': df.iloc[151, 2:98].T.reset_index(drop=True).rename('DF420'),
-            'AU': df.iloc[50, 2:98].T.reset_index(drop=True).rename('AU')
-        }
-        merged = pd.concat(list(dr_vals.values()), axis=1)
-        merged['Source'] = sheet
-        data_dr.append(merged)
-        if on_step:
-            for _ in range(6):  # 5 columns + Source
-                on_step()
+    tables = build(sheet_names, sheet_blocks, metrics, sheet_markers)
+    del sheet_blocks
+    jobs = [(df, os.path.join(output_folder, filename), table_gradients(filename, df))
+            for filename, df in tables]
 
     output_files = []
-    for label, (_, _, _, filename) in MODULES.items():
-        output_path = os.path.join(output_folder, filename)
-        process_and_save(data_modules[label], label, output_path, on_step)
-        output_files.append(output_path)
-
-    dr_output_path = os.path.join(output_folder, OUTPUT_FILE_DR)
-    final_df = pd.concat(data_dr, ignore_index=True)
-    numeric_cols = final_df.select_dtypes(include='number').columns.tolist()
-    final_df[numeric_cols] = final_df[numeric_cols].astype(float).round(2)
-
-    final_df = enrich_dataframe(final_df)
-
-    # ✅ 添加 ID 列
-    final_df.insert(0, 'ID', range(1, len(final_df) + 1))
-
-    final_df.to_excel(dr_output_path, index=False)
-    if on_step: on_step()
-
-    wb = load_workbook(dr_output_path)
-    ws = wb.active
-    col_index_map = {col: idx + 1 for idx, col in enumerate(final_df.columns) if col in numeric_cols}
-    for row in ws.iter_rows(min_row=2):
-        for col_idx in col_index_map.values():
-            cell = row[col_idx - 1]
-            if isinstance(cell.value, (int, float)):
-                cell.number_format = '0.00'
-    wb.save(dr_output_path)
-    if on_step: on_step()
-
-    apply_column_gradient(dr_output_path, target_columns=['DR485', 'DR420', 'DF485', 'DF420'],
-                          mode='three-color')
-    if on_step: on_step()
-
-    apply_column_gradient(dr_output_path, target_columns=['AU'], mode='two-color',
-                          start_color='FFFFFF', end_color='4169E1')
-    if on_step: on_step()
-
-    round_numeric_cells_in_excel(dr_output_path)
-    if on_step: on_step()
-
-    output_files.append(dr_output_path)
+    if output_format != 'xlsx':
+        output_files += write_tables([(df, path) for df, path, _ in jobs], output_format,
+                                     on_step, metrics)
+    if wants_report(output_format, report):
+        output_files += write_workbooks(jobs, DECIMAL_PLACES, workers, on_step, metrics)
+    if heatmaps:
+        output_files += render_tables(tables, HEATMAPS, output_folder, layout['wells'], workers,
+                                      metrics)
+    record_results(store, source_file, 'dual', tables, metrics=metrics)
     return output_files
 
-def run_main(file_path, on_step=None):
-    return handle_processing(file_path, on_step)
+def run_main(file_path, on_step=None, workers=None, output_dir=None, cache=None, cancel=None,
+             metrics=None, output_format='xlsx', report=None, incremental=False, streaming=False,
+             kinetics=False, wells=None, heatmaps=False, store=None, template=None):
+    return handle_processing(file_path, on_step=on_step, workers=workers, output_folder=output_dir,
+                             cache=cache, cancel=cancel, metrics=metrics,
+                             output_format=output_format, report=report, incremental=incremental,
+                             streaming=streaming, kinetics=kinetics, wells=wells,
+                             heatmaps=heatmaps, store=store, template=template)
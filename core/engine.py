@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+def stack_sheets(blocks, shape):
+    """将各 sheet 的 (rows, wells) 行窗口数组堆叠为 (sheets, rows, wells) 数组"""
+    if not blocks:
+        return np.empty((0, *shape))
+    return np.stack(blocks)
+
+def row_values(cube, row, first_row):
+    """取所有 sheet 的某一行，按 sheet→孔位 顺序展平为 (sheets * wells,)"""
+    return cube[:, row - first_row, :].reshape(-1)
+
+def time_block(cube, start, end, first_row):
+    """取 start..end 行（含两端）作为时间点，返回 (sheets * wells, end - start + 1)"""
+    block = cube[:, start - first_row:end - first_row + 1, :]
+    return block.transpose(0, 2, 1).reshape(-1, end - start + 1)
+
+def split_sheet_names(sheet_names, missing_treatment=np.nan):
+    """'P1-DrugA' → ('P1', 'DrugA')；无 '-' 时 Treatment 为 missing_treatment"""
+    plates, treatments = [], []
+    for name in sheet_names:
+        parts = name.split('-')
+        plates.append(parts[0])
+        treatments.append(parts[1] if len(parts) > 1 else missing_treatment)
+    return plates, treatments
+
+def label_columns(sheet_names, wells, missing_treatment=np.nan):
+    """
+    批量生成每行的 Plate / Sample / Source / Treatment 分类列，
+    行顺序与 row_values / time_block 一致（sheet 为外层、孔位为内层）。
+    """
+    n_wells = len(wells)
+    plates, treatments = split_sheet_names(sheet_names, missing_treatment)
+
+    def repeat_per_sheet(values):
+        codes, categories = pd.factorize(pd.Series(values, dtype=object))
+        return pd.Categorical.from_codes(np.repeat(codes, n_wells), categories=categories)
+
+    plate_prefix = np.repeat(np.array(plates, dtype=str), n_wells)
+    well_suffix = np.tile(np.array([f"-{w}" for w in wells], dtype=str), len(sheet_names))
+    return pd.DataFrame({
+        'Plate': repeat_per_sheet(plates),
+        'Sample': pd.Categorical(np.char.add(plate_prefix, well_suffix)),
+        'Source': repeat_per_sheet(sheet_names),
+        'Treatment': repeat_per_sheet(treatments),
+    })
+
+def assemble(labels, leading, values, columns, trailing):
+    """按 leading 标签列 + 数值列 + trailing 标签列的顺序拼成表"""
+    data = pd.DataFrame(values, columns=columns)
+    return pd.concat([labels[leading], data, labels[trailing]], axis=1)
+
+def round_values(values, decimal_places):
+    """按列向量化舍入（同 DataFrame.round：先乘以 10**n 再取整，如 1.705 → 1.7）"""
+    return np.round(np.asarray(values, dtype=float), decimal_places)
+
+def round_by_value(values, decimal_places):
+    """
+    与逐值调用内置 round 的结果相同（按浮点数的精确十进制值舍入，如 1.705 → 1.71）。
+    两者只在乘以 10**n 后接近 .5 的值上可能不同，仅对这些值逐个调用 round，其余向量化舍入。
+    """
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, decimal_places)
+    scaled = values * 10.0 ** decimal_places
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) <= 1e-9 * np.maximum(np.abs(scaled), 1)
+    rounded[near_tie] = [round(v, decimal_places) for v in values[near_tie].tolist()]
+    return rounded
+
+def round_sheets(values, decimal_places, sheet_markers, n_wells):
+    """
+    按 sheet 舍入数值列（行顺序为 sheet 为外层、孔位为内层）：通常按列向量化舍入（round_values），
+    读取的行中含非数值单元格的 sheet 逐值舍入（round_by_value）。按 sheet 判断，分块与增量处理的结果
+    与整表处理相同。原流程只要孔位列中任一单元格为文本（包括读取窗口之外的行）就对整个文件逐单元格 round，
+    这种文件的 T 列个别末位会与原流程不同（见 README）。
+    """
+    rounded = round_values(values, decimal_places)
+    for i, markers in enumerate(sheet_markers or ()):
+        if markers:
+            rows = slice(i * n_wells, (i + 1) * n_wells)
+            rounded[rows] = round_by_value(values[rows], decimal_places)
+    return rounded
+
+def place_markers(table, sheet_markers, row_columns, n_wells):
+    """
+    将各 sheet 的非数值单元格（如饱和标记 OVRFLW）按原文写回表中，与原流程一致。
+    sheet_markers[i] 为第 i 个 sheet 的 [(行号, 孔位序号, 文本), ...]（见 sheet_reader.text_cells），
+    row_columns 为 行号 → 该行数据所在的列名；含标记的列转为 object 列。
+    """
+    cells = [(i * n_wells + well, column, text)
+             for i, markers in enumerate(sheet_markers or ()) for row, well, text in markers
+             for column in row_columns.get(row, ())]
+    for column in dict.fromkeys(column for _, column, _ in cells):
+        table[column] = table[column].astype(object)
+    for position, column, text in cells:
+        table.iat[position, table.columns.get_loc(column)] = text
+    return table
+
+def numeric_values(df):
+    """含标记的 object 列（见 place_markers）转回 float，标记记为 NaN；供列式文件、结果库与板图使用"""
+    marked = df.select_dtypes(include='object').columns
+    if not len(marked):
+        return df
+    return df.assign(**{col: pd.to_numeric(df[col], errors='coerce') for col in marked})
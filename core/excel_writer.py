@@ -0,0 +1,189 @@
+import copy
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.formatting import ConditionalFormattingList
+from openpyxl.formatting.rule import ColorScaleRule
+from openpyxl.utils import get_column_letter
+
+from core.fileio import atomic_path
+from core.progress import RunMetrics, file_size, timed_stage
+
+def color_scale_rule(mode='three-color', start_color='00FF00', mid_color='FFFFFF',
+                     end_color='FF69B4', start_value=None, end_value=None):
+    """构建色阶规则；未给定 start/end 数值时使用列的 min/max"""
+    start = {'start_type': 'min'} if start_value is None else \
+        {'start_type': 'num', 'start_value': start_value}
+    end = {'end_type': 'max'} if end_value is None else \
+        {'end_type': 'num', 'end_value': end_value}
+
+    if mode == 'two-color':
+        return ColorScaleRule(start_color=start_color, end_color=end_color, **start, **end)
+    return ColorScaleRule(start_color=start_color,
+                          mid_type='num', mid_value=0, mid_color=mid_color,
+                          end_color=end_color, **start, **end)
+
+def column_ranges(columns, target_columns, last_row, span=False):
+    """返回目标列的单元格区域；span=True 时合并为一个连续区域"""
+    header = list(columns)
+    letters = [get_column_letter(header.index(col) + 1) for col in target_columns if col in header]
+    if not letters:
+        return []
+    if span:
+        return [f"{letters[0]}2:{letters[-1]}{last_row}"]
+    return [f"{letter}2:{letter}{last_row}" for letter in letters]
+
+def write_formatted_workbook(df, output_file, gradients=(), decimal_places=2, on_step=None,
+                             metrics=None):
+    """
+    一次性写出工作簿：数字格式和色阶规则均在内存中完成，只保存一次。
+    output_file 为路径时经临时文件原子替换，也可以是 BytesIO 等文件对象。
+    gradients: [(target_columns, rule, span), ...]
+    decimal_places 为数字格式的小数位（数值已在生成表时舍入，见 dual_core_gui_adapter.extract_tables），
+    None 时使用常规格式
+    metrics: 可选 RunMetrics，记录 write（序列化与保存）与 format（数字格式与色阶）阶段
+    """
+    with timed_stage(metrics, 'write'):
+        with atomic_path(output_file) as target, \
+                pd.ExcelWriter(target, engine='openpyxl') as writer:
+            df.to_excel(writer, index=False)
+            ws = writer.sheets['Sheet1']
+            last_row = len(df) + 1
+            if on_step: on_step()
+
+            with timed_stage(metrics, 'format'):
+                if decimal_places is not None:
+                    number_format = f'0.{"0" * decimal_places}'
+                    for row in ws.iter_rows(min_row=2, max_row=last_row):
+                        for cell in row:
+                            if isinstance(cell.value, (int, float)):
+                                cell.number_format = number_format
+                    if on_step: on_step()
+
+                for target_columns, rule, span in gradients:
+                    for ref in column_ranges(df.columns, target_columns, last_row, span):
+                        ws.conditional_formatting.add(ref, copy.copy(rule))
+                    if on_step: on_step()
+
+    if metrics is not None:
+        metrics.add('write', bytes=file_size(output_file))
+    if on_step: on_step()
+    return output_file
+
+def cell_value(value):
+    """与 DataFrame.to_excel 一致：缺失值写为空单元格，numpy 标量转为 Python 类型"""
+    if pd.isna(value):
+        return ''
+    return value.item() if hasattr(value, 'item') else value
+
+def patch_workbook(output_file, df, row_positions, total_rows, gradients=(), decimal_places=2,
+                   on_step=None, metrics=None):
+    """
+    在已有工作簿中按位置覆盖或追加数据行，并按新的行数与色阶定义重建条件格式。
+    df 的列须与表头一致；row_positions 为各行在表中的 0-based 位置（超出现有行即追加），
+    total_rows 为更新后的总数据行数。其余行保持原样，不重新写入。
+    """
+    with timed_stage(metrics, 'write'):
+        wb = load_workbook(output_file)
+        ws = wb.active
+        header = [cell.value for cell in ws[1]]
+        if header != list(df.columns):
+            raise ValueError(f"Columns of '{output_file}' do not match the table being written.")
+
+        with timed_stage(metrics, 'format'):
+            if decimal_places is not None:
+                number_format = f'0.{"0" * decimal_places}'
+            for position, values in zip(row_positions, df.itertuples(index=False)):
+                for col, value in enumerate(values, start=1):
+                    cell = ws.cell(row=position + 2, column=col, value=cell_value(value))
+                    if decimal_places is not None and isinstance(cell.value, (int, float)):
+                        cell.number_format = number_format
+
+            last_row = total_rows + 1
+            ws.conditional_formatting = ConditionalFormattingList()
+            for target_columns, rule, span in gradients:
+                for ref in column_ranges(df.columns, target_columns, last_row, span):
+                    ws.conditional_formatting.add(ref, copy.copy(rule))
+        with atomic_path(output_file) as target:
+            wb.save(target)
+
+    if metrics is not None:
+        metrics.add('write', bytes=file_size(output_file))
+    if on_step: on_step()
+    return output_file
+
+class WorkbookStream:
+    """
+    以 write-only 模式逐块追加数据行的工作簿：行在追加后即写入临时文件，内存占用与总行数无关。
+    数字格式同 write_formatted_workbook；色阶规则在 close 时按最终行数添加。
+    """
+
+    def __init__(self, output_file, columns, decimal_places=2):
+        self.output_file = output_file
+        self.columns = list(columns)
+        self.decimal_places = decimal_places
+        self.rows = 0
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet('Sheet1')
+        self.ws.append(self.columns)
+
+    def append(self, df):
+        decimal_places = self.decimal_places
+        if decimal_places is not None:
+            number_format = f'0.{"0" * decimal_places}'
+        for values in df.itertuples(index=False):
+            row = [cell_value(value) for value in values]
+            if decimal_places is not None:
+                for i, value in enumerate(row):
+                    if isinstance(value, (int, float)):
+                        row[i] = WriteOnlyCell(self.ws, value=value)
+                        row[i].number_format = number_format
+            self.ws.append(row)
+        self.rows += len(df)
+
+    def close(self, gradients=(), on_step=None):
+        """添加色阶并保存；on_step 次数与 write_formatted_workbook 相同（见 workbook_steps）"""
+        if on_step: on_step()
+        if self.decimal_places is not None and on_step: on_step()
+        for target_columns, rule, span in gradients:
+            for ref in column_ranges(self.columns, target_columns, self.rows + 1, span):
+                self.ws.conditional_formatting.add(ref, copy.copy(rule))
+            if on_step: on_step()
+        with atomic_path(self.output_file) as target:
+            self.wb.save(target)
+        if on_step: on_step()
+        return self.output_file
+
+def _write_job(df, output_file, gradients, decimal_places, collect_metrics):
+    metrics = RunMetrics() if collect_metrics else None
+    write_formatted_workbook(df, output_file, gradients, decimal_places, metrics=metrics)
+    return metrics.stages if metrics is not None else {}
+
+def workbook_steps(gradients, decimal_places=2):
+    """write_formatted_workbook 对单个工作簿触发的 on_step 次数"""
+    return 2 + (decimal_places is not None) + len(gradients)
+
+def write_workbooks(jobs, decimal_places=2, workers=None, on_step=None, metrics=None):
+    """
+    写出多个互不依赖的工作簿，jobs: [(df, output_file, gradients), ...]。
+    workers > 1 时在进程池中并发写出，每完成一个工作簿在主进程中补发其 on_step；
+    返回的文件列表顺序与 jobs 一致。
+    """
+    if not workers or workers <= 1:
+        return [write_formatted_workbook(df, output_file, gradients, decimal_places, on_step, metrics)
+                for df, output_file, gradients in jobs]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = {pool.submit(_write_job, df, output_file, gradients, decimal_places,
+                               metrics is not None): gradients
+                   for df, output_file, gradients in jobs}
+        for future in as_completed(futures):
+            stages = future.result()
+            if metrics is not None:
+                metrics.merge(stages)
+            if on_step:
+                for _ in range(workbook_steps(futures[future], decimal_places)):
+                    on_step()
+    return [output_file for _, output_file, _ in jobs]
@@ -0,0 +1,50 @@
+import io
+import os
+import uuid
+from contextlib import contextmanager
+
+def is_path(target):
+    return isinstance(target, (str, os.PathLike))
+
+def read_source(source):
+    """
+    统一输入：路径原样返回，bytes/bytearray/memoryview 与文件对象读取为 bytes。
+    bytes 可被多次打开，也可以传给子进程。
+    """
+    if is_path(source):
+        return os.fspath(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, 'read'):
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        return source.read()
+    raise TypeError(f"Expected a path, bytes or a file-like object, got {type(source).__name__}")
+
+def as_file(source):
+    """供 openpyxl / zipfile 打开：bytes 包装为 BytesIO，其余原样返回"""
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+def temp_path(target):
+    """target 同目录下以 '.' 开头、保留扩展名的临时文件名（扩展名决定部分写入器的格式）"""
+    directory, name = os.path.split(os.fspath(target))
+    stem, ext = os.path.splitext(name)
+    return os.path.join(directory, f".{stem}.{uuid.uuid4().hex[:12]}.tmp{ext}")
+
+@contextmanager
+def atomic_path(target):
+    """
+    原子写入 target：先写入 temp_path，成功后 os.replace 覆盖 target，
+    失败时删除临时文件，原有的 target 保持不变。target 不是路径（如 BytesIO）时原样返回。
+    """
+    if not is_path(target):
+        yield target
+        return
+    tmp_path = temp_path(target)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
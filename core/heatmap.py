@@ -0,0 +1,222 @@
+import math
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from core.engine import numeric_values
+from core.fileio import atomic_path
+from core.layout import PLATE_FORMATS, row_letters
+from core.parallel import split_chunks
+from core.progress import timed_stage
+
+HEATMAP_DIR = 'heatmaps'
+
+# 与报表色阶一致：三色为 min → 0 → max，两色为 min → max
+DIVERGING = ('00FF00', 'FFFFFF', 'FF69B4')
+SEQUENTIAL = ('FFFFFF', '4169E1')
+MISSING_COLOR = (192, 192, 192)
+BACKGROUND = (255, 255, 255)
+TEXT_COLOR = (0, 0, 0)
+
+# 单孔边长（像素）：孔数越多越小，整板图像大小相近
+CELL_SIZES = {96: 28, 384: 14, 1536: 7}
+THUMB_SIZES = {96: 6, 384: 3, 1536: 2}
+MARGIN = 24
+BAR_HEIGHT = 12
+LUT_SIZE = 256
+
+def palette(colors, size=LUT_SIZE):
+    """沿色标均匀插值的 (size + 1, 3) uint8 查找表，最后一项为缺失值颜色"""
+    stops = np.array([[int(c[i:i + 2], 16) for i in (0, 2, 4)] for c in colors], dtype=float)
+    positions = np.linspace(0, 1, len(stops))
+    t = np.linspace(0, 1, size)
+    lut = np.column_stack([np.interp(t, positions, stops[:, k]) for k in range(3)])
+    return np.vstack([lut.round(), MISSING_COLOR]).astype(np.uint8)
+
+def color_index(values, low, high, centered=False, size=LUT_SIZE):
+    """
+    数值 → 查找表下标；centered=True 时与 Excel 三色色阶相同：low..0 映射到前半段，0..high 映射到后半段。
+    NaN 映射到缺失值颜色（下标 size）。
+    """
+    values = np.asarray(values, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if centered and low < 0 < high:
+            t = np.where(values < 0, 0.5 * (values - low) / -low, 0.5 + 0.5 * values / high)
+        else:
+            t = (values - low) / (high - low) if high > low else np.full(values.shape, 0.5)
+    index = np.clip(np.rint(t * (size - 1)), 0, size - 1)
+    return np.where(np.isnan(values), size, index).astype(np.intp)
+
+def rasterize(plates, lut, low, high, centered, cell):
+    """
+    (plates, rows, cols) 数值 → (plates, rows * cell, cols * cell, 3) RGB 数组，
+    孔之间留 1 像素白色间隔。全部为数组运算，不逐孔绘制。
+    """
+    rgb = lut[color_index(plates, low, high, centered, len(lut) - 1)]
+    rgb = rgb.repeat(cell, axis=1).repeat(cell, axis=2)
+    if cell > 2:
+        rgb[:, cell - 1::cell] = BACKGROUND
+        rgb[:, :, cell - 1::cell] = BACKGROUND
+    return rgb
+
+def _font():
+    return ImageFont.load_default()
+
+def color_bar(lut, width):
+    """水平色标 (BAR_HEIGHT, width, 3)"""
+    index = np.linspace(0, len(lut) - 2, width).round().astype(np.intp)
+    return np.broadcast_to(lut[index], (BAR_HEIGHT, width, 3))
+
+def draw_scale(draw, image, lut, low, high, centered, left, top, width):
+    """色标及其 min/max 标注；以 0 为中点时在色标中央标注 0"""
+    image.paste(Image.fromarray(np.ascontiguousarray(color_bar(lut, width))), (left, top))
+    draw.text((left, top + BAR_HEIGHT + 2), f"{low:.4g}", fill=TEXT_COLOR, font=_font())
+    if centered and low < 0 < high:
+        draw.text((left + width // 2, top + BAR_HEIGHT + 2), "0", fill=TEXT_COLOR, font=_font(),
+                  anchor='ma')
+    text = f"{high:.4g}"
+    draw.text((left + width - draw.textlength(text, font=_font()), top + BAR_HEIGHT + 2), text,
+              fill=TEXT_COLOR, font=_font())
+
+def plate_template(wells, lut, low, high, centered, cell):
+    """所有板共用的底图：行/列标签与色标；返回 (图像, 孔区左上角)"""
+    n_rows, n_cols = PLATE_FORMATS[wells]
+    step = 1 if cell >= 14 else (2 if cell >= 7 else 4)  # 孔太小时隔行/隔列标注
+    width, height = n_cols * cell, n_rows * cell
+    origin = (MARGIN, 2 * MARGIN)
+    image = Image.new('RGB', (width + 2 * MARGIN, height + 4 * MARGIN + BAR_HEIGHT), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    font = _font()
+    for c in range(0, n_cols, step):
+        draw.text((origin[0] + c * cell + cell // 2, origin[1] - 4), str(c + 1), fill=TEXT_COLOR,
+                  font=font, anchor='mb')
+    for r, letter in list(enumerate(row_letters(n_rows)))[::step]:
+        draw.text((origin[0] - 4, origin[1] + r * cell + cell // 2), letter, fill=TEXT_COLOR,
+                  font=font, anchor='rm')
+    draw_scale(draw, image, lut, low, high, centered, origin[0],
+               origin[1] + height + MARGIN // 2, width)
+    return image, origin
+
+def save_png(image, path):
+    with atomic_path(path) as target:
+        image.save(target, format='PNG', compress_level=1)
+    return path
+
+def _render_plates(plates, names, paths, wells, colors, centered, low, high, title):
+    """在一个进程中渲染一组板图并保存，返回路径列表"""
+    lut = palette(colors)
+    cell = CELL_SIZES[wells]
+    template, origin = plate_template(wells, lut, low, high, centered, cell)
+    font = _font()
+    for raster, name, path in zip(rasterize(plates, lut, low, high, centered, cell), names, paths):
+        image = template.copy()
+        image.paste(Image.fromarray(raster), origin)
+        ImageDraw.Draw(image).text((MARGIN, MARGIN // 2), f"{name}  {title}", fill=TEXT_COLOR,
+                                   font=font)
+        save_png(image, path)
+    return paths
+
+def contact_sheet(plates, names, wells, colors, centered, low, high, title, path):
+    """所有板的缩略图按网格排列在一张图中，并附共用色标"""
+    lut = palette(colors)
+    thumbs = rasterize(plates, lut, low, high, centered, THUMB_SIZES[wells])
+    count, thumb_h, thumb_w, _ = thumbs.shape
+    tile_w, tile_h = thumb_w + 8, thumb_h + 16
+    n_cols = max(1, min(count, math.ceil(math.sqrt(count * tile_h / tile_w))))
+    n_rows = math.ceil(count / n_cols) if count else 0
+
+    # 先在数组中拼好网格，再一次性转为图像
+    grid = np.full((n_rows * tile_h, n_cols * tile_w, 3), BACKGROUND, dtype=np.uint8)
+    for i in range(count):
+        r, c = divmod(i, n_cols)
+        grid[r * tile_h:r * tile_h + thumb_h, c * tile_w:c * tile_w + thumb_w] = thumbs[i]
+
+    bar_width = max(n_cols * tile_w, 160)
+    image = Image.new('RGB', (bar_width + 2 * MARGIN, len(grid) + 5 * MARGIN), BACKGROUND)
+    image.paste(Image.fromarray(grid), (MARGIN, 2 * MARGIN))
+    draw = ImageDraw.Draw(image)
+    font = _font()
+    draw.text((MARGIN, MARGIN // 2), f"{title}  ({count} plates)", fill=TEXT_COLOR, font=font)
+    for i, name in enumerate(names):
+        r, c = divmod(i, n_cols)
+        draw.text((MARGIN + c * tile_w, 2 * MARGIN + r * tile_h + thumb_h + 1), name[:thumb_w // 6],
+                  fill=TEXT_COLOR, font=font)
+    draw_scale(draw, image, lut, low, high, centered, MARGIN,
+               2 * MARGIN + len(grid) + MARGIN // 2, bar_width)
+    return save_png(image, path)
+
+def plate_values(df, column, wells):
+    """表中某列按板还原为 (plates, rows, cols) 数组，返回 (数组, 板名列表)"""
+    n_rows, n_cols = PLATE_FORMATS[wells]
+    values = numeric_values(df[[column]])[column].to_numpy(dtype=float)
+    values = values.reshape(-1, n_rows, n_cols)
+    names = [str(name) for name in df['Source'].to_numpy()[::wells]]
+    return values, names
+
+def value_range(values):
+    finite = values[np.isfinite(values)]
+    if not finite.size:
+        return 0.0, 0.0
+    return float(finite.min()), float(finite.max())
+
+def render_heatmaps(df, columns, output_dir, wells=96, workers=None, metrics=None, names=None):
+    """
+    将表中各列按板渲染为板图 PNG：heatmaps/<名称>/<板名>.png，同一列的所有板共用一个色标
+    （min/max 取自全表），另生成缩略图总览 heatmaps/<名称>.png。
+    columns: {列: 配色}，配色为 DIVERGING 形式的三色（以 0 为中点）或两色十六进制颜色；
+    names: {列: 名称}，未给出的列以列名命名。
+    df 的行须按 sheet 连续排列（每个 sheet 占 wells 行），与 build_tables 的输出一致。
+    workers > 1 时在进程池中分块渲染。返回生成的文件路径列表。
+    """
+    root = os.path.join(output_dir, HEATMAP_DIR)
+    output_files = []
+    pool = ProcessPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+    try:
+        for column, colors in columns.items():
+            if column not in df.columns:
+                continue
+            with timed_stage(metrics, 'render', sheets=len(df) // wells):
+                plates, plate_names = plate_values(df, column, wells)
+                low, high = value_range(plates)
+                centered = len(colors) == 3
+                title = (names or {}).get(column, column)
+                column_dir = os.path.join(root, title)
+                os.makedirs(column_dir, exist_ok=True)
+                paths = [os.path.join(column_dir, f"{name}.png") for name in plate_names]
+                args = (wells, colors, centered, low, high, title)
+
+                if pool is None:
+                    output_files += _render_plates(plates, plate_names, paths, *args)
+                else:
+                    chunks = split_chunks(list(range(len(plate_names))), workers * 4)
+                    futures = [pool.submit(_render_plates, plates[chunk[0]:chunk[-1] + 1],
+                                           plate_names[chunk[0]:chunk[-1] + 1],
+                                           paths[chunk[0]:chunk[-1] + 1], *args)
+                               for chunk in chunks if chunk]
+                    for future in futures:
+                        output_files += future.result()
+                output_files.append(contact_sheet(plates, plate_names, *args,
+                                                  os.path.join(root, f"{title}.png")))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return output_files
+
+def render_tables(tables, heatmaps, output_dir, wells=96, workers=None, metrics=None):
+    """
+    tables: [(filename, df), ...]；heatmaps: {filename: {列: 配色}}，依次渲染各表的指定列。
+    在多个表中渲染的同名列（如各模块表的 T6）以 <文件名>-<列> 命名，如 DR485-Kinetics-T6。
+    """
+    counts = Counter(column for columns in heatmaps.values() for column in columns)
+    output_files = []
+    for filename, df in tables:
+        if filename in heatmaps:
+            stem = os.path.splitext(filename)[0]
+            names = {column: f"{stem}-{column}" for column in heatmaps[filename]
+                     if counts[column] > 1}
+            output_files += render_heatmaps(df, heatmaps[filename], output_dir, wells, workers,
+                                            metrics, names)
+    return output_files
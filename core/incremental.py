@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import zipfile
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from core.cache import iter_sheet_blocks
+from core.columnar import patch_table, table_path, wants_report, write_tables
+from core.engine import numeric_values
+from core.excel_writer import patch_workbook, write_workbooks
+from core.fileio import as_file, atomic_path
+from core.layout import block_reader
+from core.parallel import iter_sheets
+from core.progress import check_cancel, file_size, timed_iter, timed_stage
+from core.sniff import sheet_parts
+from core.store import record_results
+
+STATE_FILE = '.mprocess-state.json'
+STATE_FORMAT = 1
+
+def sheet_digests(source, chunk_size=1 << 20):
+    """
+    不解析单元格，直接对 xlsx 包中各工作表的 XML 部件求哈希，返回 [(sheet_name, digest), ...]。
+    数值单元格（含公式的缓存值）保存在工作表部件内，数据变化时哈希随之改变。
+    """
+    digests = []
+    with zipfile.ZipFile(as_file(source)) as zf:
+        for name, part in sheet_parts(zf):
+            digest = hashlib.sha256()
+            with zf.open(part) as f:
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    digest.update(chunk)
+            digests.append((name, digest.hexdigest()))
+    return digests
+
+def load_state(output_dir):
+    try:
+        with open(os.path.join(output_dir, STATE_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_state(output_dir, state):
+    with atomic_path(os.path.join(output_dir, STATE_FILE)) as tmp_path, \
+            open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+
+def output_stats(paths):
+    stats = {}
+    for path in paths:
+        stat = os.stat(path)
+        stats[os.path.basename(path)] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+def plan_update(state, settings, digests, output_dir):
+    """
+    返回需要重新解析的 sheet 位置（新增或内容变化）。无法增量更新时返回 None：
+    无状态或参数不同、输出文件缺失或在上次运行后被改动、已处理的 sheet 被删除/改名/重排。
+    """
+    if not state or any(state.get(key) != value for key, value in settings.items()):
+        return None
+    for name, stat in state['outputs'].items():
+        path = os.path.join(output_dir, name)
+        if not os.path.exists(path) or output_stats([path])[name] != stat:
+            return None
+
+    old = state['sheets']
+    if [entry['name'] for entry in old] != [name for name, _ in digests[:len(old)]]:
+        return None
+    return [i for i, (_, digest) in enumerate(digests)
+            if i >= len(old) or digest != old[i]['digest']]
+
+def _bound(value):
+    return None if np.isnan(value) else float(value)
+
+def sheet_bounds(df, n_sheets):
+    """逐 sheet 计算各数值列（ID 除外）的 [min, max]，忽略 NaN；全为 NaN 时记为 None"""
+    if not n_sheets:
+        return []
+    df = numeric_values(df)
+    columns = [col for col in df.select_dtypes(include='number').columns if col != 'ID']
+    values = df[columns].to_numpy(dtype=float).reshape(n_sheets, -1, len(columns))
+    lows, highs = np.fmin.reduce(values, axis=1), np.fmax.reduce(values, axis=1)
+    return [{col: [_bound(lo), _bound(hi)] for col, lo, hi in zip(columns, low, high)}
+            for low, high in zip(lows, highs)]
+
+def bounds_frame(sheets, filename):
+    """
+    将各 sheet 记录的 min/max 合并为两行（全表 min 与 max）的 DataFrame。
+    色阶函数在其上计算出的上下限与在完整表上计算的相同。
+    """
+    lows, highs = {}, {}
+    for entry in sheets:
+        for col, (low, high) in entry['bounds'][filename].items():
+            lows.setdefault(col, []).append(np.nan if low is None else low)
+            highs.setdefault(col, []).append(np.nan if high is None else high)
+    return pd.DataFrame({col: [np.fmin.reduce(lows[col]), np.fmax.reduce(highs[col])]
+                         for col in lows})
+
+def update_outputs(source, output_dir, layout, build_tables, table_gradients, decimal_places=2,
+                   sheet_steps=1, on_step=None, workers=None, cache=None, cancel=None,
+                   metrics=None, output_format='xlsx', report=None, store=None):
+    """
+    增量处理持续追加 sheet 的工作簿：与 output_dir 中上次运行记录的各 sheet 内容哈希对比，
+    只解析新增或内容变化的 sheet，将其数据行追加或覆盖到已有输出中，ID 保持连续。
+    色阶上下限由状态文件中逐 sheet 记录的 min/max 合并得出，不重新读取已有数据行。
+    无法增量更新时（见 plan_update）退回完整处理并重建状态。
+
+    build_tables(sheet_names, sheet_blocks, metrics, sheet_markers) -> [(filename, df), ...]，
+    每个 sheet 在各表中占连续的 layout['wells'] 行；table_gradients(filename, df) 返回色阶定义。
+    """
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    report = wants_report(output_format, report)
+    if metrics is not None:
+        metrics.info.update(mode=layout['mode'], source=os.path.abspath(source), incremental=True)
+        metrics.add('parse', bytes=file_size(source))
+
+    with timed_stage(metrics, 'parse'):
+        digests = sheet_digests(source)
+    settings = json.loads(json.dumps({'format': STATE_FORMAT, 'layout': layout,
+                                      'output_format': output_format, 'report': report}))
+    state = load_state(output_dir)
+    positions = plan_update(state, settings, digests, output_dir)
+    full = positions is None
+
+    if full:
+        positions = list(range(len(digests)))
+        blocks = iter_sheet_blocks(source, layout, workers=workers, cache=cache)
+    elif not positions:
+        print(f"✅ 没有新增或变化的 sheet：{output_dir}")
+        return [os.path.join(output_dir, name) for name in state['outputs']]
+    else:
+        blocks = iter_sheets(block_reader(layout), source, [digests[p][0] for p in positions],
+                             workers)
+
+    sheet_names, sheet_blocks, sheet_markers = [], [], []
+    with closing(blocks):
+        for sheet_name, values, markers in timed_iter(metrics, 'parse', blocks):
+            check_cancel(cancel)
+            sheet_names.append(sheet_name)
+            sheet_blocks.append(values)
+            sheet_markers.append(markers)
+            if on_step:
+                for _ in range(sheet_steps):
+                    on_step()
+    check_cancel(cancel)
+    if metrics is not None:
+        metrics.info['sheet_count'] = len(digests)
+
+    tables = build_tables(sheet_names, sheet_blocks, metrics, sheet_markers)
+    del sheet_blocks
+    n_wells = layout['wells']
+    row_positions = (np.asarray(positions)[:, None] * n_wells + np.arange(n_wells)).reshape(-1)
+    total_rows = len(digests) * n_wells
+
+    sheets = [] if full else list(state['sheets'])
+    sheets += [None] * (len(digests) - len(sheets))
+    for p in positions:
+        sheets[p] = {'name': digests[p][0], 'digest': digests[p][1], 'bounds': {}}
+    for filename, df in tables:
+        if not full and 'ID' in df.columns:
+            df['ID'] = row_positions + 1
+        for p, bounds in zip(positions, sheet_bounds(df, len(positions))):
+            sheets[p]['bounds'][filename] = bounds
+
+    targets = [(filename, df, os.path.join(output_dir, filename)) for filename, df in tables]
+    output_files = []
+    if output_format != 'xlsx':
+        if full:
+            output_files += write_tables([(df, path) for _, df, path in targets], output_format,
+                                         on_step, metrics)
+        else:
+            for _, df, path in targets:
+                path = table_path(path, output_format)
+                with timed_stage(metrics, 'write'):
+                    output_files.append(patch_table(df, path, output_format, row_positions))
+                if metrics is not None:
+                    metrics.add('write', bytes=file_size(path))
+                if on_step: on_step()
+
+    if report:
+        if full:
+            jobs = [(df, path, table_gradients(filename, df)) for filename, df, path in targets]
+            output_files += write_workbooks(jobs, decimal_places, workers, on_step, metrics)
+        else:
+            for filename, df, path in targets:
+                with timed_stage(metrics, 'format'):
+                    gradients = table_gradients(filename, bounds_frame(sheets, filename))
+                output_files.append(patch_workbook(path, df, row_positions, total_rows, gradients,
+                                                   decimal_places, on_step, metrics))
+
+    save_state(output_dir, {**settings, 'sheets': sheets, 'outputs': output_stats(output_files)})
+    record_results(store, source, layout['mode'], tables, replace=full, metrics=metrics)
+    if full:
+        print(f"✅ 文件已生成：{output_dir}")
+    else:
+        print(f"✅ 已增量更新 {len(positions)} 个 sheet：{output_dir}")
+    return output_files
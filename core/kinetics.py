@@ -0,0 +1,60 @@
+import numpy as np
+
+# 由 T1–Tn 计算的动力学参数列，依次对应 kinetic_metrics 的各列
+METRIC_COLUMNS = ['Slope', 'THalf', 'AUC']
+
+def time_points(n_points, interval=1.0):
+    """T1–Tn 对应的时间；默认以时间点序号为单位（T1 = 1）"""
+    return np.arange(1, n_points + 1) * float(interval)
+
+def slope(traces, times):
+    """逐行（孔）的最小二乘斜率，traces: (wells, points)；忽略 NaN，有效点少于 2 个时为 NaN"""
+    valid = ~np.isnan(traces)
+    count = valid.sum(axis=1)
+    t = np.where(valid, times, 0.0)
+    y = np.where(valid, traces, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t_centered = np.where(valid, times - (t.sum(axis=1) / count)[:, None], 0.0)
+        y_centered = np.where(valid, y - (y.sum(axis=1) / count)[:, None], 0.0)
+        return (t_centered * y_centered).sum(axis=1) / (t_centered ** 2).sum(axis=1)
+
+def auc(traces, times):
+    """梯形法曲线下面积；任一时间点缺失时为 NaN"""
+    return ((traces[:, 1:] + traces[:, :-1]) * np.diff(times)).sum(axis=1) / 2
+
+def time_to_half_max(traces, times):
+    """
+    相对 T1 的变化量首次达到最大变化量一半的时间，在相邻时间点间线性插值；
+    下降曲线按变化量的绝对值计算。T1 缺失或曲线无变化时为 NaN。
+    """
+    rows = np.arange(len(traces))
+    delta = traces - traces[:, :1]
+    magnitude = np.abs(delta)
+    peak = delta[rows, np.where(np.isnan(magnitude), -np.inf, magnitude).argmax(axis=1)]
+    response = delta * np.sign(peak)[:, None]
+    half = np.abs(peak) / 2
+
+    after = (response >= half[:, None]).argmax(axis=1)
+    before = np.maximum(after - 1, 0)
+    low, high = response[rows, before], response[rows, after]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = np.where(after > before, (half - low) / (high - low), 0.0)
+    result = times[before] + fraction * (times[after] - times[before])
+    result[~(np.abs(peak) > 0)] = np.nan
+    return result
+
+def ratio(numerator, denominator):
+    """逐时间点的通道比值（如 485/420）；分母为 0 时为 NaN"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominator == 0, np.nan, numerator / denominator)
+
+def kinetic_metrics(traces, times=None):
+    """
+    对所有板、所有孔一次性计算动力学参数，traces 为 time_block 返回的 (wells, points) 数组，
+    返回 (wells, len(METRIC_COLUMNS)) 数组。times 默认为 time_points(points)。
+    """
+    traces = np.asarray(traces, dtype=float)
+    if times is None:
+        times = time_points(traces.shape[1])
+    return np.column_stack([slope(traces, times), time_to_half_max(traces, times),
+                            auc(traces, times)])
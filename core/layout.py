@@ -0,0 +1,81 @@
+import string
+from functools import partial
+
+from core.sheet_reader import FIRST_WELL_COL, read_sheet_block
+
+# 孔板规格：孔数 → (行数, 列数)
+PLATE_FORMATS = {
+    96: (8, 12),
+    384: (16, 24),
+    1536: (32, 48),
+}
+
+# 版式描述（可 JSON 序列化，同时用作缓存键与增量状态的一部分）。
+# 每个时间点/参数占一行（0-based 行号），各孔自 C 列起按 A01, A02, …（行优先）横向排列。
+SINGLE = {
+    'mode': 'single',
+    'wells': 96,
+    'time_rows': [13, 22],  # T1–T10
+    'dr_row': 22,
+    'au_row': 13,
+}
+DUAL = {
+    'mode': 'dual',
+    'wells': 96,
+    # 模块 → [T1 行, T6 行, DR 行]
+    'modules': {
+        'DR485': [41, 46, 48],
+        'DR420': [61, 66, 68],
+        'DF485': [126, 131, 132],
+        'DF420': [145, 150, 151],
+    },
+    'au_row': 50,
+}
+LAYOUTS = {'single': SINGLE, 'dual': DUAL}
+
+def row_letters(n_rows):
+    """A, B, …, Z, AA, AB, …（1536 孔板为 32 行：A–AF）"""
+    letters = list(string.ascii_uppercase)
+    return (letters + [a + b for a in letters for b in letters])[:n_rows]
+
+def well_names(wells=96):
+    """按行优先顺序的孔位名，如 96 孔板 A01…H12、384 孔板 A01…P24"""
+    n_rows, n_cols = PLATE_FORMATS[wells]
+    return [f'{r}{c:02d}' for r in row_letters(n_rows) for c in range(1, n_cols + 1)]
+
+def used_rows(layout):
+    """版式中需要读取的所有行"""
+    if 'modules' in layout:
+        rows = [row for start, end, dr_row in layout['modules'].values()
+                for row in (*range(start, end + 1), dr_row)]
+    else:
+        start, end = layout['time_rows']
+        rows = [*range(start, end + 1), layout['dr_row']]
+    return rows + [layout['au_row']]
+
+def row_window(layout):
+    """需读取的行窗口 (first_row, last_row)（0-based，含两端）"""
+    rows = used_rows(layout)
+    return min(rows), max(rows)
+
+def col_window(layout):
+    """孔位数据列 (first_col, last_col)（0-based，含两端）"""
+    return FIRST_WELL_COL, FIRST_WELL_COL + layout['wells'] - 1
+
+def block_shape(layout):
+    """每个 sheet 的行窗口数组形状 (rows, wells)"""
+    first_row, last_row = row_window(layout)
+    return last_row - first_row + 1, layout['wells']
+
+def block_reader(layout):
+    """供 parallel.iter_sheets 使用的读取函数（可 pickle）"""
+    first_row, last_row = row_window(layout)
+    first_col, last_col = col_window(layout)
+    return partial(read_sheet_block, first_row=first_row, last_row=last_row,
+                   first_col=first_col, last_col=last_col)
+
+def with_wells(layout, wells):
+    if wells not in PLATE_FORMATS:
+        raise ValueError(f"Unsupported plate format: {wells} wells, "
+                         f"expected one of: {', '.join(map(str, PLATE_FORMATS))}")
+    return layout if layout['wells'] == wells else dict(layout, wells=wells)
@@ -0,0 +1,61 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from core.sheet_reader import list_sheets, open_workbook
+
+def split_chunks(items, n_chunks):
+    """按顺序切分为至多 n_chunks 个连续块"""
+    n_chunks = max(1, min(n_chunks, len(items)))
+    size, extra = divmod(len(items), n_chunks)
+    chunks, start = [], 0
+    for i in range(n_chunks):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+def _extract_chunk(func, source, sheet_names):
+    wb = open_workbook(source)
+    try:
+        return [func(wb[name], name) for name in sheet_names]
+    finally:
+        wb.close()
+
+def iter_sheets(func, source, sheet_names=None, workers=None):
+    """
+    依次返回 func(ws, sheet_name) 的结果，顺序与 sheet_names（默认全部 sheet）一致。
+    workers > 1 时将连续的 sheet 分块交给进程池，每个进程只打开一次工作簿；
+    func 必须是模块级函数（可被 pickle）。
+    """
+    if not workers or workers <= 1:
+        yield from _iter_serial(func, source, sheet_names)
+        return
+
+    sheet_names = list(list_sheets(source) if sheet_names is None else sheet_names)
+
+    chunks = iter(split_chunks(sheet_names, workers * 4))
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        # 同时在途的分块不超过 2 × workers，消费方较慢时结果不会在内存中堆积
+        for chunk in islice(chunks, workers * 2):
+            pending.append(pool.submit(_extract_chunk, func, source, chunk))
+        while pending:
+            results = pending.popleft().result()
+            for chunk in islice(chunks, 1):
+                pending.append(pool.submit(_extract_chunk, func, source, chunk))
+            yield from results
+    finally:
+        # 提前关闭（如取消）时丢弃尚未开始的分块（cancel_futures 需要 Python 3.9）
+        for future in pending:
+            future.cancel()
+        pool.shutdown()
+
+def _iter_serial(func, source, sheet_names):
+    wb = open_workbook(source)
+    try:
+        for name in (wb.sheetnames if sheet_names is None else sheet_names):
+            yield func(wb[name], name)
+    finally:
+        wb.close()
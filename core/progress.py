@@ -0,0 +1,116 @@
+import cProfile
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+# 处理流程的命名阶段
+STAGES = ('parse', 'extract', 'enrich', 'write', 'format', 'render', 'store')
+
+class ProcessingCancelled(Exception):
+    """处理在 sheet 之间被取消"""
+
+def check_cancel(cancel):
+    """cancel 为 threading.Event 等带 is_set() 的对象；已置位时抛出 ProcessingCancelled"""
+    if cancel is not None and cancel.is_set():
+        raise ProcessingCancelled("Processing cancelled.")
+
+class RunMetrics:
+    """
+    按阶段统计墙钟耗时、调用次数、字节数与 sheet 数。
+    阶段可以嵌套，嵌套阶段的耗时从外层阶段中扣除，因此各阶段耗时之和不重复计算。
+    """
+
+    def __init__(self, **info):
+        self.info = dict(info)
+        self.stages = {}
+        self._stack = []
+        self._started = time.perf_counter()
+        self.total_seconds = None
+
+    def _entry(self, name):
+        return self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'bytes': 0, 'sheets': 0})
+
+    def add(self, name, seconds=0.0, calls=0, bytes=0, sheets=0):
+        entry = self._entry(name)
+        entry['seconds'] += seconds
+        entry['calls'] += calls
+        entry['bytes'] += bytes
+        entry['sheets'] += sheets
+
+    @contextmanager
+    def stage(self, name, bytes=0, sheets=0):
+        frame = [time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield self
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[0]
+            if self._stack:
+                self._stack[-1][1] += elapsed
+            self.add(name, elapsed - frame[1], 1, bytes, sheets)
+
+    def merge(self, stages):
+        """合并其他进程返回的 stages 字典"""
+        for name, entry in stages.items():
+            self.add(name, **entry)
+
+    def finish(self):
+        self.total_seconds = time.perf_counter() - self._started
+        return self
+
+    def as_dict(self):
+        total = self.total_seconds
+        if total is None:
+            total = time.perf_counter() - self._started
+        return {**self.info, 'total_seconds': total, 'stages': self.stages}
+
+    def to_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, ensure_ascii=False, indent=2)
+        return path
+
+    def summary(self):
+        lines = []
+        for name in sorted(self.stages, key=lambda n: STAGES.index(n) if n in STAGES else len(STAGES)):
+            entry = self.stages[name]
+            lines.append(f"{name:<8}{entry['seconds']:>9.3f}s  calls={entry['calls']}"
+                         f"  sheets={entry['sheets']}  bytes={entry['bytes']}")
+        return "\n".join(lines)
+
+def timed_stage(metrics, name, bytes=0, sheets=0):
+    """metrics 为 None 时不计时"""
+    if metrics is None:
+        return nullcontext()
+    return metrics.stage(name, bytes, sheets)
+
+def timed_iter(metrics, name, iterable):
+    """逐项计时迭代（如按 sheet 解析），每取出一项记 1 个 sheet"""
+    if metrics is None:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            metrics.add(name, time.perf_counter() - start)
+            return
+        metrics.add(name, time.perf_counter() - start, calls=1, sheets=1)
+        yield item
+
+def file_size(path):
+    """路径返回文件大小，bytes 返回其长度，其他（如 BytesIO）返回 0"""
+    if isinstance(path, bytes):
+        return len(path)
+    return os.path.getsize(path) if isinstance(path, (str, os.PathLike)) else 0
+
+def profile_call(profile_path, func, *args, **kwargs):
+    """在 cProfile 下调用 func，并将统计结果写入 profile_path（可用 pstats/snakeviz 查看）"""
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(profile_path)
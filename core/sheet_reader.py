@@ -0,0 +1,54 @@
+import numpy as np
+from openpyxl import load_workbook
+
+from core.fileio import as_file
+
+# 96 孔板的孔位数据列 C..CT（0-based，与 df.iloc[:, 2:98] 一致）；其他规格见 core.layout
+FIRST_WELL_COL = 2
+LAST_WELL_COL = 97
+
+def open_workbook(source):
+    """只读模式打开工作簿（路径、bytes 或文件对象），工作表按需流式解析"""
+    return load_workbook(as_file(source), read_only=True, data_only=True)
+
+def list_sheets(source):
+    wb = open_workbook(source)
+    try:
+        return wb.sheetnames
+    finally:
+        wb.close()
+
+def to_float_array(rows):
+    try:
+        return np.array(rows, dtype=float)
+    except (TypeError, ValueError):
+        return np.array([[v if isinstance(v, (int, float)) else np.nan for v in row]
+                         for row in rows], dtype=float)
+
+def text_cells(rows, first_row=0):
+    """
+    非数值的非空单元格（如仪器的饱和标记 OVRFLW）：[(行号, 列序号, 文本), ...]，
+    行号从 first_row 起计，列序号相对于读取的首列；to_float_array 将这些单元格记为 NaN
+    """
+    return [(first_row + i, j, str(v)) for i, row in enumerate(rows) for j, v in enumerate(row)
+            if v is not None and v != '' and not isinstance(v, (int, float))]
+
+def _read_values(ws, first_row, last_row, first_col, last_col):
+    rows = list(ws.iter_rows(min_row=first_row + 1, max_row=last_row + 1,
+                             min_col=first_col + 1, max_col=last_col + 1,
+                             values_only=True))
+    if len(rows) < last_row - first_row + 1:
+        raise ValueError(f"Sheet '{ws.title}' has only {len(rows) + first_row} rows, "
+                         f"row {last_row + 1} is required.")
+    return rows
+
+def read_sheet_block(ws, sheet_name, first_row, last_row, first_col=FIRST_WELL_COL,
+                     last_col=LAST_WELL_COL):
+    """
+    供 parallel.iter_sheets 使用：返回 (sheet_name, float 数组, 非数值单元格)，
+    后者见 text_cells（列序号即孔位序号），通常为空列表
+    """
+    rows = _read_values(ws, first_row, last_row, first_col, last_col)
+    values = to_float_array(rows)
+    markers = text_cells(rows, first_row) if np.isnan(values).any() else []
+    return sheet_name, values, markers
@@ -1,121 +1,183 @@
+import numpy as np
 import pandas as pd
 import os
-import shutil
-from openpyxl import load_workbook
-from openpyxl.formatting.rule import ColorScaleRule
-from openpyxl.utils import get_column_letter
-
-def run_main(filepath, on_step=None):
-    kinetics_file = 'Kinetics.xlsx'
-    dr_file = 'DR.xlsx'
-
-    xl = pd.ExcelFile(filepath)
-    wells = [r + f"{c:02d}" for r in 'ABCDEFGH' for c in range(1, 13)]
-    data_frames = []
-
-    for sheet_name in xl.sheet_names:
-        df = xl.parse(sheet_name, header=None)
-        block = df.iloc[13:23, 2:98].T.reset_index(drop=True)
-        block.columns = [f'T{i+1}' for i in range(10)]
-
-        dr = df.iloc[22, 2:98].T.reset_index(drop=True).rename('DR')
-        au = df.iloc[13, 2:98].T.reset_index(drop=True).rename('AU')
-
-        plate = sheet_name.split('-')[0]
-        treatment = sheet_name.split('-')[1] if '-' in sheet_name else ''
-        sample_ids = [f"{plate}-{w}" for w in wells]
-
-        meta = pd.DataFrame({
-            'Plate': plate,
-            'Sample': sample_ids,
-            'Source': sheet_name,
-            'Treatment': treatment
-        })
-
-        merged = pd.concat([meta, block, dr, au], axis=1)
-        data_frames.append(merged)
-
-        if on_step:
-            for _ in range(12):  # Plate, Sample, Source, Treatment + T1–T10 + DR + AU
-                on_step()
-
-    full_df = pd.concat(data_frames, ignore_index=True)
-    full_df.to_excel(kinetics_file, index=False)
-    if on_step: on_step()
-
-    apply_shared_gradient(kinetics_file, ['T1','T2','T3','T4','T5','T6','DR'], on_step)
-    apply_individual_gradient(kinetics_file, ['AU'], on_step)
-
-    df_kinetics = pd.read_excel(kinetics_file)
-    df_dr = df_kinetics[['Sample', 'Plate', 'Source', 'Treatment', 'DR', 'AU']].copy()
-    df_dr.insert(0, 'ID', range(1, len(df_dr) + 1))
-    df_dr.to_excel(dr_file, index=False)
-    if on_step: on_step()
-
-    apply_individual_gradient(dr_file, ['DR', 'AU'], on_step)
-
-    return move_and_cleanup([kinetics_file, dr_file], filepath)
-
-def apply_shared_gradient(file_path, columns, on_step=None):
-    wb = load_workbook(file_path)
-    ws = wb.active
-    headers = [str(cell.value).strip() for cell in ws[1]]
-    df = pd.DataFrame(ws.iter_rows(min_row=2, values_only=True), columns=headers)
-
+from contextlib import closing
+from functools import partial
+from core.excel_writer import color_scale_rule, write_formatted_workbook
+from core.heatmap import render_tables
+from core.cache import iter_sheet_blocks
+from core.columnar import check_output_format, wants_report, write_tables
+from core.progress import check_cancel, file_size, timed_iter, timed_stage
+from core.engine import assemble, label_columns, place_markers, row_values, stack_sheets, time_block
+from core.incremental import update_outputs
+from core.kinetics import METRIC_COLUMNS, kinetic_metrics
+from core.layout import SINGLE, block_shape, row_window, well_names
+from core.sniff import resolve_layout
+from core.store import record_results
+from core.streaming import check_run_options, stream_outputs
+
+# 默认（96 孔板）版式；孔板规格按输入文件判断，见 core.layout
+LAYOUT = SINGLE
+
+KINETICS_FILE = 'Kinetics.xlsx'
+DR_FILE = 'DR.xlsx'
+DECIMAL_PLACES = None  # 报表保留原始数值与常规格式
+# heatmaps=True 时渲染为板图的列（最后一个时间点、DR 与 AU）及配色（与报表色阶相同）
+GRADIENT_COLORS = ('00FF00', 'FFFFFF', 'FF00FF')
+HEATMAPS = {KINETICS_FILE: {'T10': GRADIENT_COLORS},
+            DR_FILE: {'DR': GRADIENT_COLORS, 'AU': GRADIENT_COLORS}}
+
+def extract_kinetics(cube, sheet_names, kinetics=False, layout=LAYOUT, sheet_markers=None):
+    """
+    由 (sheets, rows, wells) 数组一次性生成 Kinetics 表：按版式 layout 取 T1–T10、DR 与 AU 行；
+    kinetics=True 时在 AU 之后加入由 T1–T10 计算的动力学参数列（METRIC_COLUMNS）。
+    sheet_markers 为各 sheet 的非数值单元格，按原文保留（见 engine.place_markers）。
+    """
+    first_row, _ = row_window(layout)
+    start, end = layout['time_rows']
+    labels = label_columns(sheet_names, well_names(layout['wells']), missing_treatment='')
+    traces = time_block(cube, start, end, first_row)
+    metric_values = [kinetic_metrics(traces)] if kinetics else []
+    values = np.column_stack([
+        traces,
+        row_values(cube, layout['dr_row'], first_row),
+        row_values(cube, layout['au_row'], first_row),
+        *metric_values,
+    ])
+    columns = ([f'T{i+1}' for i in range(end - start + 1)] + ['DR', 'AU']
+               + (METRIC_COLUMNS if kinetics else []))
+    table = assemble(labels, ['Plate', 'Sample', 'Source', 'Treatment'], values, columns, [])
+    row_columns = {row: [f'T{row - start + 1}'] for row in range(start, end + 1)}
+    row_columns.setdefault(layout['dr_row'], []).append('DR')
+    row_columns.setdefault(layout['au_row'], []).append('AU')
+    return place_markers(table, sheet_markers, row_columns, layout['wells'])
+
+def count_steps(sheet_count, output_format='xlsx', report=None):
+    """run_main 对给定 sheet 数触发的 on_step 总次数（用于驱动进度条）；动力学参数列不增加步数"""
+    # 每个 sheet 12 次；Kinetics.xlsx 与 DR.xlsx 各 4 次（写入 + 两组色阶 + 保存），列式表各 1 次
+    steps = sheet_count * 12
+    if output_format != 'xlsx':
+        steps += 2
+    if wants_report(output_format, report):
+        steps += 8
+    return steps
+
+def build_tables(sheet_names, sheet_blocks, metrics=None, sheet_markers=None, kinetics=False,
+                 layout=LAYOUT):
+    """
+    由各 sheet 的行窗口数组生成 [(filename, df), ...]：Kinetics 表与带连续 ID 的 DR 表。
+    DR 表的标签列与 Kinetics 表相同，均为文本；原流程经 Kinetics.xlsx 读回，全为数字的标签列会变为数值
+    """
+    with timed_stage(metrics, 'extract', sheets=len(sheet_names)):
+        cube = stack_sheets(sheet_blocks, block_shape(layout))
+        full_df = extract_kinetics(cube, sheet_names, kinetics, layout, sheet_markers)
+
+    with timed_stage(metrics, 'enrich'):
+        df_dr = full_df[['Sample', 'Plate', 'Source', 'Treatment', 'DR', 'AU']].copy()
+        df_dr.insert(0, 'ID', range(1, len(df_dr) + 1))
+    return [(KINETICS_FILE, full_df), (DR_FILE, df_dr)]
+
+def table_gradients(filename, df):
+    """各输出表的色阶定义；色阶上下限为表中数值的 min/max"""
+    if filename == KINETICS_FILE:
+        return (shared_gradient(df, ['T1', 'T2', 'T3', 'T4', 'T5', 'T6', 'DR'])
+                + individual_gradients(df, ['AU']))
+    return individual_gradients(df, ['DR', 'AU'])
+
+def run_main(filepath, on_step=None, workers=None, output_dir=None, cache=None, cancel=None,
+             metrics=None, output_format='xlsx', report=None, incremental=False, streaming=False,
+             kinetics=False, wells=None, heatmaps=False, store=None, template=None):
+    check_output_format(output_format)
+    check_run_options(incremental, streaming, cache, heatmaps)
+    target_dir = output_dir or os.path.dirname(os.path.abspath(filepath))
+    layout = resolve_layout(LAYOUT, filepath, wells, template=template)
+    build = partial(build_tables, kinetics=kinetics, layout=layout)
+    if streaming:
+        if metrics is not None:
+            metrics.info.update(mode='single', source=os.path.abspath(filepath), streaming=True)
+        output_files = stream_outputs(filepath, target_dir, layout, build, table_gradients,
+                                      DECIMAL_PLACES, sheet_steps=12,
+                                      on_step=on_step, workers=workers, cancel=cancel,
+                                      metrics=metrics, output_format=output_format, report=report,
+                                      store=store)
+        print(f"✅ 文件已生成：{target_dir}")
+        return output_files
+    if incremental:
+        if kinetics:
+            layout = dict(layout, kinetics=True)
+        return update_outputs(filepath, target_dir, layout, build, table_gradients,
+                              DECIMAL_PLACES, sheet_steps=12, on_step=on_step, workers=workers, cache=cache,
+                              cancel=cancel, metrics=metrics, output_format=output_format,
+                              report=report, store=store)
+    if metrics is not None:
+        metrics.info.update(mode='single', source=os.path.abspath(filepath))
+        metrics.add('parse', bytes=file_size(filepath))
+
+    sheet_names, sheet_blocks, sheet_markers = [], [], []
+    blocks = iter_sheet_blocks(filepath, layout, workers=workers, cache=cache)
+    with closing(blocks):
+        for sheet_name, values, markers in timed_iter(metrics, 'parse', blocks):
+            check_cancel(cancel)
+            sheet_names.append(sheet_name)
+            sheet_blocks.append(values)
+            sheet_markers.append(markers)
+
+            if on_step:
+                for _ in range(12):  # Plate, Sample, Source, Treatment + T1–T10 + DR + AU
+                    on_step()
+    check_cancel(cancel)
+    if metrics is not None:
+        metrics.info['sheet_count'] = len(sheet_names)
+
+    tables = build(sheet_names, sheet_blocks, metrics, sheet_markers)
+    del sheet_blocks
+
+    os.makedirs(target_dir, exist_ok=True)
+    jobs = [(df, os.path.join(target_dir, filename)) for filename, df in tables]
+
+    output_files = []
+    if output_format != 'xlsx':
+        output_files += write_tables(jobs, output_format, on_step, metrics)
+
+    if wants_report(output_format, report):
+        for df, path in jobs:
+            with timed_stage(metrics, 'format'):
+                gradients = table_gradients(os.path.basename(path), df)
+            write_formatted_workbook(df, path, gradients, DECIMAL_PLACES,
+                                     on_step=on_step, metrics=metrics)
+            output_files.append(path)
+    if heatmaps:
+        output_files += render_tables(tables, HEATMAPS, target_dir, layout['wells'],
+                                      workers, metrics)
+    record_results(store, filepath, 'single', tables, metrics=metrics)
+
+    print(f"✅ 文件已生成：{target_dir}")
+    return output_files
+
+def gradient_rule(min_val, max_val):
+    start, mid, end = GRADIENT_COLORS
+    return color_scale_rule('three-color', start_color=start, mid_color=mid,
+                            end_color=end, start_value=min_val, end_value=max_val)
+
+def shared_gradient(df, columns):
+    """在内存中计算多列共享的 min/max，返回 write_formatted_workbook 所需的色阶定义"""
     cols = [col for col in columns if col in df.columns]
     if not cols:
-        wb.save(file_path)
-        return
-
+        return []
     values = pd.concat([pd.to_numeric(df[col], errors='coerce') for col in cols], axis=1).values.flatten()
     valid = pd.Series(values).dropna()
     if valid.empty:
-        wb.save(file_path)
-        return
-
-    min_val, max_val = valid.min(), valid.max()
-    col_letters = [get_column_letter(headers.index(col) + 1) for col in cols]
-    ref = f"{col_letters[0]}2:{col_letters[-1]}{ws.max_row}"
-    rule = ColorScaleRule(
-        start_type='num', start_value=min_val, start_color='00FF00',
-        mid_type='num', mid_value=0, mid_color='FFFFFF',
-        end_type='num', end_value=max_val, end_color='FF00FF'
-    )
-    ws.conditional_formatting.add(ref, rule)
-    wb.save(file_path)
-    if on_step: on_step()
-
-def apply_individual_gradient(file_path, columns, on_step=None):
-    wb = load_workbook(file_path)
-    ws = wb.active
-    headers = [str(cell.value).strip() for cell in ws[1]]
-    df = pd.DataFrame(ws.iter_rows(min_row=2, values_only=True), columns=headers)
+        return []
+    return [(cols, gradient_rule(valid.min(), valid.max()), True)]
 
+def individual_gradients(df, columns):
+    """逐列计算 min/max 的色阶定义"""
+    gradients = []
     for col in columns:
         if col not in df.columns:
             continue
         values = pd.to_numeric(df[col], errors='coerce').dropna()
         if values.empty:
             continue
-        min_val, max_val = values.min(), values.max()
-        col_letter = get_column_letter(headers.index(col) + 1)
-        ref = f"{col_letter}2:{col_letter}{ws.max_row}"
-        rule = ColorScaleRule(
-            start_type='num', start_value=min_val, start_color='00FF00',
-            mid_type='num', mid_value=0, mid_color='FFFFFF',
-            end_type='num', end_value=max_val, end_color='FF00FF'
-        )
-        ws.conditional_formatting.add(ref, rule)
-        if on_step: on_step()
-    wb.save(file_path)
-
-def move_and_cleanup(files, source_path):
-    target_dir = os.path.dirname(os.path.abspath(source_path))
-    moved_files = []
-    for file in files:
-        target_path = os.path.join(target_dir, file)
-        shutil.copy(file, target_path)
-        os.remove(file)
-        moved_files.append(target_path)
-    print(f"✅ 文件已复制并清理：{target_dir}")
-    return moved_files
+        gradients.append(([col], gradient_rule(values.min(), values.max()), False))
+    return gradients
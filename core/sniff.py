@@ -0,0 +1,334 @@
+import hashlib
+import json
+import os
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+from core.cache import DEFAULT_CACHE_DIR
+from core.fileio import as_file, atomic_path
+from core.layout import LAYOUTS, PLATE_FORMATS, row_window, used_rows, with_wells
+from core.sheet_reader import FIRST_WELL_COL
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_DOC_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# 模板签名 → 版式名 的缓存文件名，位于缓存目录中（见 template_cache_path）
+TEMPLATE_CACHE = 'templates.json'
+# 签名取自这些行的标签单元格（各版式首个数据行之前的表头）
+HEADER_ROWS = min(row_window(layout)[0] for layout in LAYOUTS.values())
+# 未命中缓存时读取到所有版式都覆盖的最后一行
+PROBE_ROWS = max(row_window(layout)[1] for layout in LAYOUTS.values())
+
+EMPTY_ROW = ((), False, 0)
+_CELL_REF = re.compile(r'([A-Z]+)(\d+)')
+_DIMENSION = re.compile(rb'<dimension ref="(?:[^":]*:)?([A-Z]+)\d+"')
+_CELL_START = re.compile(rb'<c[^>]*? r="([A-Z]+)\d+"')
+_ROW_START = re.compile(rb'<row\b(?:[^>]*? r="(\d+)")?[^>]*>')
+_known = {}
+
+def sheet_parts(zf):
+    """[(sheet_name, 工作表 XML 部件路径), ...]，按工作簿中的顺序"""
+    workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(f'{_PKG_REL_NS}Relationship')}
+    parts = []
+    for sheet in workbook.iter(f'{_MAIN_NS}sheet'):
+        target = targets[sheet.get(f'{_DOC_REL_NS}id')]
+        parts.append((sheet.get('name'),
+                      target[1:] if target.startswith('/') else posixpath.normpath(f'xl/{target}')))
+    return parts
+
+def sheet_names(source):
+    """只读取 xl/workbook.xml 得到 sheet 名列表，不加载工作簿"""
+    with zipfile.ZipFile(as_file(source)) as zf:
+        return [name for name, _ in sheet_parts(zf)]
+
+def column_index(letters):
+    """'A' → 0, 'C' → 2, 'AA' → 26"""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+class SharedStrings:
+    """按需解析 sharedStrings.xml，只读到所请求的下标为止"""
+
+    def __init__(self, zf):
+        self.values = []
+        self._items = None
+        if 'xl/sharedStrings.xml' in zf.namelist():
+            self._items = ET.iterparse(zf.open('xl/sharedStrings.xml'))
+
+    def get(self, index):
+        while self._items is not None and index >= len(self.values):
+            event, elem = next(self._items, (None, None))
+            if elem is None:
+                self._items = None
+            elif elem.tag == f'{_MAIN_NS}si':
+                self.values.append(''.join(t.text or '' for t in elem.iter(f'{_MAIN_NS}t')))
+                elem.clear()
+        return self.values[index] if index < len(self.values) else ''
+
+class SheetProbe:
+    """
+    流式解析一个工作表 XML 的前若干行。每行只保留：
+    孔位列之前的标签单元格（文本）、孔位列中是否有数值、最后一个非空孔位的序号（1-based）。
+    """
+
+    def __init__(self, f, strings):
+        self.rows = {}
+        self.dimension = None
+        self.last_row = -1
+        self._strings = strings
+        self._events = ET.iterparse(f, events=('end',))
+
+    def _cell(self, cell):
+        kind, value = cell.get('t'), cell.find(f'{_MAIN_NS}v')
+        if kind == 'inlineStr':
+            return ''.join(t.text or '' for t in cell.iter(f'{_MAIN_NS}t'))
+        if value is None:
+            return None
+        if kind == 's':
+            return self._strings.get(int(value.text))
+        if kind in (None, 'n'):
+            return float(value.text)
+        return value.text
+
+    def _column(self, cell, default):
+        ref = _CELL_REF.match(cell.get('r') or '')
+        return column_index(ref.group(1)) if ref else default
+
+    def _read_row(self, elem):
+        """只检查行首的标签、第一个有值的孔位与最后一个有值的孔位，不逐个处理中间的单元格"""
+        labels = [''] * FIRST_WELL_COL
+        wells = []
+        for i, cell in enumerate(elem):
+            col = self._column(cell, i)
+            if col >= FIRST_WELL_COL:
+                wells = elem[i:]
+                break
+            value = self._cell(cell)
+            labels[col] = '' if value is None else str(value)
+        valued = [cell for cell in wells[:1] + wells[-1:]
+                  if cell.find(f'{_MAIN_NS}v') is not None or cell.get('t') == 'inlineStr']
+        numeric = any(cell.get('t') in (None, 'n') for cell in valued)
+        # 行首或行尾是空单元格或非数值（如 OVRFLW）时才逐个查找
+        if wells and (len(valued) < 2 or not all(cell.get('t') in (None, 'n') for cell in valued)):
+            valued = [cell for cell in wells
+                      if cell.find(f'{_MAIN_NS}v') is not None or cell.get('t') == 'inlineStr']
+            numeric = any(cell.get('t') in (None, 'n') for cell in valued)
+        filled = (self._column(valued[-1], 0) - FIRST_WELL_COL + 1) if valued else 0
+        return tuple(labels), numeric, filled
+
+    def read_to(self, last_row):
+        """解析到 last_row（0-based）为止，之后的行不读取；返回 {行号: (标签, 是否有数值, 已填孔数)}"""
+        while self._events is not None and self.last_row < last_row:
+            event, elem = next(self._events, (None, None))
+            if elem is None:
+                self._events = None
+            elif elem.tag == f'{_MAIN_NS}dimension':
+                self.dimension = elem.get('ref')
+            elif elem.tag == f'{_MAIN_NS}row':
+                row = int(elem.get('r')) - 1 if elem.get('r') else self.last_row + 1
+                self.rows[row] = self._read_row(elem)
+                self.last_row = row
+                elem.clear()
+        return self.rows
+
+    def signature(self):
+        """
+        表头标签与工作表尺寸（<dimension>）的哈希；缺少 <dimension> 时返回 None（不缓存），
+        因为仅凭表头无法区分行数不同的模板。
+        """
+        self.read_to(HEADER_ROWS - 1)
+        if self.dimension is None:
+            return None
+        labels = [self.rows[row][0] for row in sorted(self.rows) if row < HEADER_ROWS]
+        text = json.dumps([self.dimension, labels], ensure_ascii=False)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+def _last_column(data, start, end):
+    """data[start:end] 内（一行）最后一个有值单元格的列号（0-based），没有时返回 -1"""
+    value = max(data.rfind(b'<v>', start, end), data.rfind(b'<is>', start, end))
+    cell = _CELL_START.match(data, data.rfind(b'<c ', start, value)) if value != -1 else None
+    return column_index(cell.group(1).decode()) if cell else -1
+
+def well_columns(f, chunk_size=1 << 14):
+    """
+    工作表的孔位列数：取自工作表尺寸（<dimension>）的最后一列；缺少 <dimension> 时扫描整个工作表，
+    取各行最后一个有值单元格的最大列号。只做字节查找、不解析 XML，每行只检查行尾。
+    """
+    data = b''
+    while b'<sheetData' not in data:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        data += chunk
+    dimension = _DIMENSION.search(data, 0, max(data.find(b'<sheetData'), 0))
+    if dimension:
+        return max(column_index(dimension.group(1).decode()) - FIRST_WELL_COL + 1, 0)
+
+    data += f.read()
+    last, start = -1, 0
+    end = data.find(b'</row>')
+    while end != -1:
+        last = max(last, _last_column(data, start, end))
+        start, end = end, data.find(b'</row>', end + 6)
+    return max(last - FIRST_WELL_COL + 1, 0)
+
+def data_columns(f, rows, chunk_size=1 << 16):
+    """
+    工作表中 rows（0-based 行号）各行最后一个有值单元格的最大孔位序号，读到其中最后一行即停止。
+    well_columns 取整个工作表的宽度，表格外的零散单元格（如右侧的备注）会使其宽于孔板；
+    此时按版式的数据行判断孔板规格。与 well_columns 相同，只做字节查找。
+    """
+    rows = set(rows)
+    data, pos, row, last = b'', 0, -1, -1
+    while True:
+        end = data.find(b'</row>', pos)
+        if end == -1:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            data, pos = data[pos:] + chunk, 0
+            continue
+        tags = list(_ROW_START.finditer(data, pos, end))
+        if tags:
+            number = tags[-1].group(1)
+            row = int(number) - 1 if number else row + 1
+            if row in rows:
+                last = max(last, _last_column(data, tags[-1].end(), end))
+            if row >= max(rows):
+                break
+        pos = end + 6
+    return max(last - FIRST_WELL_COL + 1, 0)
+
+def layout_fits(layout, rows):
+    """版式要求的每一行都有数值孔位"""
+    return all(rows.get(row, EMPTY_ROW)[1] for row in used_rows(layout))
+
+def match_mode(rows):
+    """与数据行位置相符的版式名；都相符时取所需行数更多的版式，都不相符时返回 None"""
+    modes = [mode for mode, layout in LAYOUTS.items() if layout_fits(layout, rows)]
+    return max(modes, key=lambda mode: row_window(LAYOUTS[mode])[1], default=None)
+
+def plate_format(columns):
+    """
+    由孔位列数判断孔板规格：恰为某一规格的孔数时取该规格，少于最小规格时视为未填满的 96 孔板；
+    介于两种规格之间时无法判断，返回 None
+    """
+    if columns in PLATE_FORMATS:
+        return columns
+    smallest = min(PLATE_FORMATS)
+    return smallest if columns < smallest else None
+
+def template_cache_path():
+    """与 PlateCache 相同，缓存目录可由环境变量 MPROCESS_CACHE_DIR 指定"""
+    return os.path.join(os.environ.get('MPROCESS_CACHE_DIR', DEFAULT_CACHE_DIR), TEMPLATE_CACHE)
+
+def known_templates():
+    path = template_cache_path()
+    if path not in _known:
+        try:
+            with open(path, encoding='utf-8') as f:
+                _known[path] = json.load(f)
+        except (OSError, ValueError):
+            _known[path] = {}
+    return _known[path]
+
+def remember(signature, mode):
+    """记录模板签名对应的版式；缓存目录不可写时只保留在内存中"""
+    known = known_templates()
+    if known.get(signature) == mode:
+        return
+    known[signature] = mode
+    path = template_cache_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_path(path) as tmp_path, open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(known, f)
+    except OSError:
+        pass
+
+def sniff(source, layout=None, cache=True, plate=True):
+    """
+    只读取 xlsx 包中的工作簿目录和第一个 sheet 的前若干行 XML（不加载工作簿），返回
+    {'mode': 版式名或 None, 'sheets': sheet 名列表, 'fits': bool, 'layout': fits 针对的版式名,
+     'columns': 孔位列数, 'wells': 孔板规格, 'signature': ...}。
+    mode 按各版式要求的行是否有数值判断；fits 针对 layout（未给定时针对 mode 的版式）。
+    plate=True 时 columns 取所有 sheet 中最大的孔位列数（见 well_columns；由此无法判断规格的 sheet
+    改按版式数据行的宽度，见 data_columns），wells 由其判断，无法判断时为 None；plate=False 时两者均为 None。
+    cache=True 时模板签名到版式的对应关系记录在缓存目录的 TEMPLATE_CACHE 中，命中后只需读到首个数据行；
+    cache=False 时不读取也不写入该文件。
+    """
+    with zipfile.ZipFile(as_file(source)) as zf:
+        parts = sheet_parts(zf)
+        if not parts:
+            raise ValueError("Workbook has no worksheets")
+        with zf.open(parts[0][1]) as f:
+            probe = SheetProbe(f, SharedStrings(zf))
+            signature = probe.signature()
+            mode = known_templates().get(signature) if cache and signature else None
+            cached = mode in LAYOUTS
+            if not cached:
+                mode = match_mode(probe.read_to(PROBE_ROWS))
+                if cache and signature and mode:
+                    remember(signature, mode)
+
+            target = layout or LAYOUTS.get(mode)
+            fits = False
+            if target is not None:
+                first_row, last_row = row_window(target)
+                if cached and target['mode'] == mode:
+                    # 模板已验证过，只需读到首个数据行
+                    rows = probe.read_to(first_row)
+                    fits = rows.get(first_row, EMPTY_ROW)[1]
+                else:
+                    rows = probe.read_to(last_row)
+                    fits = layout_fits(target, rows)
+
+        columns = wells = None
+        if plate:
+            columns = 0
+            for _, part in parts:
+                with zf.open(part) as f:
+                    width = well_columns(f)
+                if plate_format(width) is None and target is not None:
+                    with zf.open(part) as f:
+                        width = data_columns(f, used_rows(target))
+                columns = max(columns, width)
+            wells = plate_format(columns)
+    return {'mode': mode, 'sheets': [name for name, _ in parts], 'fits': fits,
+            'layout': target['mode'] if target is not None else None,
+            'columns': columns, 'wells': wells, 'signature': signature}
+
+def sniff_mode(source, cache=True, template=None):
+    """按版式判断处理模式；与任何版式都不相符时报错。template 为已有的 sniff 结果时不再读取输入"""
+    mode = (template or sniff(source, cache=cache, plate=False))['mode']
+    if mode is None:
+        raise ValueError("Input matches neither the single nor the dual layout.")
+    return mode
+
+def resolve_layout(layout, source, wells=None, cache=True, template=None):
+    """
+    检查输入与版式相符后返回带孔板规格的版式；wells 为 None 时按输入判断。
+    只要 layout 要求的每一行都有数值即接受，即使另一版式也相符（match_mode 仅用于自动判断模式）；
+    不相符或无法判断孔板规格时报错，避免在完整解析后才失败或得到错位的数据。
+    template 为已有的 sniff 结果（未指定 layout、wells 为 None 时 plate=True）时不再读取孔板规格；
+    其 fits 针对另一版式时只重新检查 layout 的数据行（不使用模板缓存）。
+    """
+    template = template or sniff(source, layout, cache, plate=wells is None)
+    if template['layout'] != layout['mode']:
+        template = dict(template, fits=sniff(source, layout, cache=False, plate=False)['fits'])
+    if not template['fits']:
+        found = (f"it looks like a {template['mode']} export" if template['mode']
+                 else "no known layout matches")
+        raise ValueError(f"Input does not match the {layout['mode']} layout ({found}).")
+    if wells is None and template['wells'] is None:
+        raise ValueError(f"Cannot tell the plate format from {template['columns']} well columns; "
+                         f"set the number of wells explicitly "
+                         f"({', '.join(map(str, PLATE_FORMATS))}).")
+    return with_wells(layout, wells or template['wells'])
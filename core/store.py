@@ -0,0 +1,311 @@
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+from contextlib import closing
+
+import pandas as pd
+
+from core.engine import numeric_values
+from core.progress import timed_stage
+
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser('~'), '.mprocess', 'results.sqlite')
+INDEXED_COLUMNS = ('Plate', 'Sample', 'Treatment', 'Source')
+SUMMARY_FILE = 'DR.xlsx'
+# top_k 分组数不超过此值时逐组按索引取前 k 项，否则用窗口函数一次排名
+GROUP_QUERIES = 64
+
+def table_name(mode, filename):
+    """('dual', 'DR485-Kinetics.xlsx') → 'dual_DR485_Kinetics'"""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return re.sub(r'\W', '_', f"{mode}_{stem}")
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def sql_type(dtype):
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_numeric_dtype(dtype):
+        return 'REAL'
+    return 'TEXT'
+
+def sql_rows(df):
+    """逐行转为 Python 值：数值保持原类型，分类列转为字符串，缺失值为 NULL"""
+    columns = []
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        values = values.astype(object).where(values.notna(), None)
+        columns.append(values.tolist())
+    return zip(*columns)
+
+class ResultStore:
+    """
+    跨运行的本地结果库（SQLite）：每个输出表对应一张表（见 table_name），行带 run_id，
+    runs 表记录每个输入文件在每种模式下最近一次处理的时间。同一输入文件以同一模式再次处理时覆盖其旧结果。
+    Plate / Sample / Treatment / Source 建有索引，按化合物、板或处理条件查询无需读取 xlsx。
+    只保存路径，可传给子进程；多个进程同时写入时由 SQLite 的锁排队。
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('MPROCESS_STORE', DEFAULT_STORE_PATH)
+
+    def connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=60)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute("""CREATE TABLE IF NOT EXISTS runs (
+            run_id INTEGER PRIMARY KEY, input_path TEXT NOT NULL, mode TEXT NOT NULL,
+            processed_at REAL NOT NULL, UNIQUE (input_path, mode))""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS result_tables (
+            name TEXT PRIMARY KEY, mode TEXT NOT NULL, filename TEXT NOT NULL)""")
+        with conn:
+            self._split_runs(conn)
+        return conn
+
+    def _split_runs(self, conn):
+        """
+        早期版本的 runs 表每个输入文件只有一行，两种模式的结果共用 run_id，mode 为最后一次的模式。
+        按 (input_path, mode) 重建 runs 表，并把各结果表中其他模式的行改挂到对应模式的 run_id 上。
+        """
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'runs'").fetchone()[0]
+        if 'UNIQUE (input_path, mode)' in sql:
+            return
+        conn.execute('ALTER TABLE runs RENAME TO runs_by_path')
+        conn.execute("""CREATE TABLE runs (
+            run_id INTEGER PRIMARY KEY, input_path TEXT NOT NULL, mode TEXT NOT NULL,
+            processed_at REAL NOT NULL, UNIQUE (input_path, mode))""")
+        conn.execute('INSERT INTO runs SELECT run_id, input_path, mode, processed_at '
+                     'FROM runs_by_path')
+        conn.execute('DROP TABLE runs_by_path')
+        for name, mode in conn.execute('SELECT name, mode FROM result_tables').fetchall():
+            stale = conn.execute(f"""SELECT DISTINCT r.run_id, r.input_path, r.processed_at
+                                     FROM {quote(name)} t JOIN runs r USING (run_id)
+                                     WHERE r.mode != ?""", (mode,)).fetchall()
+            for run_id, input_path, processed_at in stale:
+                conn.execute('INSERT OR IGNORE INTO runs (input_path, mode, processed_at) '
+                             'VALUES (?, ?, ?)', (input_path, mode, processed_at))
+                new_id = conn.execute('SELECT run_id FROM runs WHERE input_path = ? AND mode = ?',
+                                      (input_path, mode)).fetchone()[0]
+                conn.execute(f'UPDATE {quote(name)} SET run_id = ? WHERE run_id = ?',
+                             (new_id, run_id))
+
+    def _ensure_table(self, conn, mode, filename, df):
+        """按 df 建表；已有表缺少的列（如新增的动力学参数列）以 ALTER TABLE 补齐"""
+        name = table_name(mode, filename)
+        existing = [row[1] for row in conn.execute(f'PRAGMA table_info({quote(name)})')]
+        if not existing:
+            columns = ', '.join(f'{quote(col)} {sql_type(df[col].dtype)}' for col in df.columns)
+            conn.execute(f'CREATE TABLE {quote(name)} (run_id INTEGER NOT NULL, {columns})')
+            conn.execute(f'CREATE INDEX {quote(f"{name}_run_id")} ON {quote(name)} (run_id)')
+            for col in INDEXED_COLUMNS:
+                if col in df.columns:
+                    conn.execute(f'CREATE INDEX {quote(f"{name}_{col}")} ON {quote(name)} '
+                                 f'({quote(col)})')
+            conn.execute('INSERT OR REPLACE INTO result_tables VALUES (?, ?, ?)',
+                         (name, mode, filename))
+        else:
+            for col in df.columns:
+                if col not in existing:
+                    conn.execute(f'ALTER TABLE {quote(name)} ADD COLUMN {quote(col)} '
+                                 f'{sql_type(df[col].dtype)}')
+        return name
+
+    def upsert(self, source, mode, tables, replace=True):
+        """
+        写入一次运行的结果 tables: [(filename, df), ...]。
+        replace=True 时先删除该输入文件在 mode 各表中的旧结果（其他模式的结果保留）；
+        否则只替换 tables 中出现的 sheet（Source）。
+        """
+        source = os.path.abspath(source)
+        with closing(self.connect()) as conn, conn:
+            conn.execute("""INSERT INTO runs (input_path, mode, processed_at) VALUES (?, ?, ?)
+                            ON CONFLICT(input_path, mode) DO UPDATE SET
+                            processed_at = excluded.processed_at""", (source, mode, time.time()))
+            run_id = conn.execute('SELECT run_id FROM runs WHERE input_path = ? AND mode = ?',
+                                  (source, mode)).fetchone()[0]
+            if replace:
+                for (name,) in conn.execute('SELECT name FROM result_tables WHERE mode = ?',
+                                            (mode,)).fetchall():
+                    conn.execute(f'DELETE FROM {quote(name)} WHERE run_id = ?', (run_id,))
+
+            for filename, df in tables:
+                df = numeric_values(df)
+                name = self._ensure_table(conn, mode, filename, df)
+                if not replace and 'Source' in df.columns:
+                    sheets = [str(s) for s in pd.unique(df['Source'].astype(object))]
+                    conn.executemany(f'DELETE FROM {quote(name)} WHERE run_id = ? AND Source = ?',
+                                     [(run_id, sheet) for sheet in sheets])
+                columns = ', '.join(['run_id'] + [quote(col) for col in df.columns])
+                marks = ', '.join('?' * (len(df.columns) + 1))
+                conn.executemany(f'INSERT INTO {quote(name)} ({columns}) VALUES ({marks})',
+                                 ((run_id, *row) for row in sql_rows(df)))
+        return run_id
+
+    def query(self, sql, params=()):
+        """执行任意只读 SQL，返回 DataFrame；连接设为 query_only，写入语句报错"""
+        with closing(self.connect()) as conn:
+            conn.execute('PRAGMA query_only = ON')
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def runs(self):
+        return self.query('SELECT * FROM runs ORDER BY processed_at')
+
+    def tables(self, filename=None, column=None):
+        """结果表名列表；可按输出文件名与所含的列筛选"""
+        with closing(self.connect()) as conn:
+            rows = conn.execute('SELECT name, filename FROM result_tables ORDER BY name').fetchall()
+            return [name for name, table_file in rows
+                    if (filename is None or table_file == filename)
+                    and (column is None or column in
+                         [row[1] for row in conn.execute(f'PRAGMA table_info({quote(name)})')])]
+
+    def _ensure_index(self, conn, name, columns):
+        index = f"{name}_{'_'.join(columns)}"
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {quote(index)} ON {quote(name)} '
+                     f'({", ".join(quote(col) for col in columns)})')
+
+    def top_k(self, column='DR', k=10, per='Treatment', filename=SUMMARY_FILE, treatment=None):
+        """
+        按 column 从大到小取每个 per（Plate / Sample / Treatment / Source，默认 Treatment）分组的
+        前 k 行，跨所有运行；per=None 时不分组。treatment 给定时只查该处理条件。
+        首次查询某列时建立 (per, column) 索引，之后每组只读取索引中的前 k 项（组数较少时）。
+        """
+        if per is not None and per not in INDEXED_COLUMNS:
+            raise ValueError(f"per must be one of: {', '.join(INDEXED_COLUMNS)}")
+        names = self.tables(filename, column)
+        if not names:
+            raise KeyError(f"No stored table{f' {filename}' if filename else ''} "
+                           f"has a column '{column}'.")
+        frames = []
+        with closing(self.connect()) as conn, conn:
+            for name in names:
+                self._ensure_index(conn, name, [per, column] if per else [column])
+                where = [f't.{quote(column)} IS NOT NULL']
+                params = []
+                if treatment is not None:
+                    where.append('t.Treatment = ?')
+                    params.append(treatment)
+                rows = f"""SELECT r.input_path, r.mode, r.processed_at, t.Plate, t.Sample,
+                                  t.Treatment, t.Source, t.{quote(column)} AS {quote(column)}
+                           FROM {quote(name)} t JOIN runs r USING (run_id)"""
+                groups = [()] if per is None else conn.execute(
+                    f'SELECT DISTINCT {quote(per)} FROM {quote(name)} LIMIT ?',
+                    (GROUP_QUERIES + 1,)).fetchall()
+                if len(groups) > GROUP_QUERIES:
+                    sql = f"""SELECT * FROM (
+                                 SELECT *, ROW_NUMBER() OVER (PARTITION BY {quote(per)}
+                                                              ORDER BY {quote(column)} DESC) AS rank
+                                 FROM ({rows} WHERE {' AND '.join(where)}))
+                             WHERE rank <= ?"""
+                    frames.append(pd.read_sql_query(sql, conn, params=(*params, k))
+                                  .drop(columns='rank'))
+                    continue
+                if per is not None:
+                    where.append(f't.{quote(per)} IS ?')
+                sql = f"{rows} WHERE {' AND '.join(where)} ORDER BY t.{quote(column)} DESC LIMIT ?"
+                frames += [pd.read_sql_query(sql, conn, params=(*params, *group, k))
+                           for group in groups]
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame(columns=['input_path', 'mode', 'processed_at', *INDEXED_COLUMNS,
+                                         column, 'rank'])
+        # 多张表（如多种模式）的候选行合并后重新排名
+        ranked = pd.concat(frames, ignore_index=True).sort_values(column, ascending=False,
+                                                                  kind='stable')
+        if per is None:
+            ranked = ranked.head(k)
+            ranked['rank'] = range(1, len(ranked) + 1)
+            return ranked.reset_index(drop=True)
+        ranked = ranked.groupby(per, dropna=False, sort=False).head(k)
+        ranked['rank'] = ranked.groupby(per, dropna=False, sort=False).cumcount() + 1
+        return ranked.sort_values([per, 'rank'], kind='stable').reset_index(drop=True)
+
+    def sample_history(self, sample, filename=SUMMARY_FILE):
+        """某个样本（如 'P001-A01'）在所有运行中的结果，按处理时间排序"""
+        frames = []
+        with closing(self.connect()) as conn:
+            for name in self.tables(filename):
+                frames.append(pd.read_sql_query(
+                    f"""SELECT r.input_path, r.mode, r.processed_at, t.* FROM {quote(name)} t
+                        JOIN runs r USING (run_id) WHERE t.Sample = ?""", conn, params=(sample,)))
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        history = pd.concat(frames, ignore_index=True).drop(columns='run_id')
+        return history.sort_values('processed_at', kind='stable').reset_index(drop=True)
+
+def resolve_store(store):
+    """store 参数可为 None/False（不写入）、True（默认位置）、数据库路径或 ResultStore 实例"""
+    if not store:
+        return None
+    if store is True:
+        return ResultStore()
+    if isinstance(store, (str, os.PathLike)):
+        return ResultStore(os.fspath(store))
+    return store
+
+def record_results(store, source, mode, tables, replace=True, metrics=None):
+    """store 未设置时不写入；写入耗时计入 metrics 的 'store' 阶段"""
+    store = resolve_store(store)
+    if store is None:
+        return None
+    with timed_stage(metrics, 'store'):
+        return store.upsert(source, mode, tables, replace)
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m core.store',
+        description='Query results collected with --store across runs.')
+    parser.add_argument('--db', default=None, help=f'results database (default: {DEFAULT_STORE_PATH})')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    top = commands.add_parser('top', help='top-k rows by a value, per treatment')
+    top.add_argument('column', nargs='?', default='DR', help='value column (default: DR)')
+    top.add_argument('-k', type=int, default=10, help='rows per group (default: 10)')
+    top.add_argument('--per', choices=INDEXED_COLUMNS, default='Treatment',
+                     help='grouping column (default: Treatment)')
+    top.add_argument('--all', action='store_true', help='rank all rows without grouping')
+    top.add_argument('--treatment', default=None, help='only this treatment')
+    top.add_argument('--table', default=SUMMARY_FILE,
+                     help=f'output table to search (default: {SUMMARY_FILE})')
+
+    sample = commands.add_parser('sample', help='all stored results of one sample')
+    sample.add_argument('sample', help="sample name, e.g. 'P001-A01'")
+    sample.add_argument('--table', default=SUMMARY_FILE,
+                        help=f'output table to search (default: {SUMMARY_FILE})')
+
+    commands.add_parser('runs', help='list the stored runs')
+    sql = commands.add_parser('sql', help='run an SQL query')
+    sql.add_argument('query')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    store = ResultStore(args.db)
+    if not os.path.exists(store.path):
+        print(f"❌ No results database at {store.path}", file=sys.stderr)
+        return 2
+    try:
+        if args.command == 'top':
+            result = store.top_k(args.column, args.k, None if args.all else args.per, args.table,
+                                 args.treatment)
+        elif args.command == 'sample':
+            result = store.sample_history(args.sample, args.table)
+        elif args.command == 'runs':
+            result = store.runs()
+        else:
+            result = store.query(args.query)
+    except (KeyError, ValueError, sqlite3.Error, pd.errors.DatabaseError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    with pd.option_context('display.max_rows', None, 'display.width', None):
+        print(result.to_string(index=False) if not result.empty else '(no rows)')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
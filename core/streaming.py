@@ -0,0 +1,138 @@
+import os
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from core.columnar import TableStream, table_path, wants_report
+from core.engine import numeric_values
+from core.excel_writer import WorkbookStream
+from core.layout import block_reader
+from core.parallel import iter_sheets
+from core.progress import check_cancel, file_size, timed_iter, timed_stage
+from core.store import record_results
+
+# 每次一起提取与写出的 sheet 数；内存占用只与该值有关，与总 sheet 数无关
+DEFAULT_CHUNK_SHEETS = 64
+
+def check_run_options(incremental=False, streaming=False, cache=None, heatmaps=False):
+    """
+    流式处理不保存全部 sheet，因此不能与增量模式或解析缓存同时使用；
+    板图的共用色标需要完整的表，流式与增量模式下不生成。
+    """
+    if streaming and incremental:
+        raise ValueError("streaming and incremental processing cannot be combined.")
+    if streaming and cache:
+        raise ValueError("streaming processing does not use the parse cache.")
+    if heatmaps and (streaming or incremental):
+        raise ValueError("heatmaps need the full tables and are not available with "
+                         "streaming or incremental processing.")
+
+class RunningBounds:
+    """逐块更新各表数值列（ID 除外）的 min/max，忽略 NaN"""
+
+    def __init__(self):
+        self.bounds = {}
+
+    def update(self, filename, df):
+        if df.empty:
+            return
+        df = numeric_values(df)
+        columns = [col for col in df.select_dtypes(include='number').columns if col != 'ID']
+        values = df[columns].to_numpy(dtype=float)
+        low, high = np.fmin.reduce(values, axis=0), np.fmax.reduce(values, axis=0)
+        if filename in self.bounds:
+            old_low, old_high = self.bounds[filename][1:]
+            low, high = np.fmin(old_low, low), np.fmax(old_high, high)
+        self.bounds[filename] = (columns, low, high)
+
+    def frame(self, filename):
+        """两行（全表 min 与 max）的 DataFrame，色阶函数在其上计算出的上下限与完整表相同"""
+        if filename not in self.bounds:
+            return pd.DataFrame()
+        columns, low, high = self.bounds[filename]
+        return pd.DataFrame([low, high], columns=columns)
+
+def stream_outputs(source, output_dir, layout, build_tables, table_gradients, decimal_places=2,
+                   sheet_steps=1, on_step=None, workers=None, cancel=None, metrics=None,
+                   output_format='xlsx', report=None, chunk_sheets=DEFAULT_CHUNK_SHEETS,
+                   store=None):
+    """
+    流式处理：sheet 按 chunk_sheets 个一组经 build_tables 提取后立即追加到各输出
+    （write-only 工作簿或列式表的 row group），色阶上下限以逐块更新的 min/max 计算。
+    峰值内存与总 sheet 数无关。store 给定时逐块写入结果库（首块替换该文件的旧结果）。
+    输出先写入临时文件，全部完成后才替换目标文件；中途取消或出错时原有输出保持不变。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    report = wants_report(output_format, report)
+    if metrics is not None:
+        metrics.add('parse', bytes=file_size(source))
+
+    blocks = iter_sheets(block_reader(layout), source, workers=workers)
+    bounds = RunningBounds()
+    tables, workbooks = {}, {}
+    written_rows = written_sheets = 0
+
+    def write_chunk(sheet_names, sheet_blocks, sheet_markers):
+        nonlocal written_rows, written_sheets
+        outputs = build_tables(sheet_names, sheet_blocks, metrics, sheet_markers)
+        for filename, df in outputs:
+            if 'ID' in df.columns:
+                df['ID'] += written_rows
+            bounds.update(filename, df)
+            path = os.path.join(output_dir, filename)
+            with timed_stage(metrics, 'write'):
+                if output_format != 'xlsx':
+                    if filename not in tables:
+                        tables[filename] = TableStream(table_path(path, output_format),
+                                                       output_format, df.columns)
+                    tables[filename].append(df)
+                if report:
+                    if filename not in workbooks:
+                        workbooks[filename] = WorkbookStream(path, df.columns, decimal_places)
+                    workbooks[filename].append(df)
+        record_results(store, source, layout['mode'], outputs, replace=not written_sheets,
+                       metrics=metrics)
+        written_rows += len(outputs[0][1])
+        written_sheets += len(sheet_names)
+
+    try:
+        sheet_names, sheet_blocks, sheet_markers = [], [], []
+        with closing(blocks):
+            for sheet_name, values, markers in timed_iter(metrics, 'parse', blocks):
+                check_cancel(cancel)
+                sheet_names.append(sheet_name)
+                sheet_blocks.append(values)
+                sheet_markers.append(markers)
+                if on_step:
+                    for _ in range(sheet_steps):
+                        on_step()
+                if len(sheet_names) == chunk_sheets:
+                    write_chunk(sheet_names, sheet_blocks, sheet_markers)
+                    sheet_names, sheet_blocks, sheet_markers = [], [], []
+        check_cancel(cancel)
+        if sheet_names or not written_sheets:
+            write_chunk(sheet_names, sheet_blocks, sheet_markers)
+        del sheet_blocks
+        if metrics is not None:
+            metrics.info['sheet_count'] = written_sheets
+
+        output_files = []
+        for stream in tables.values():
+            with timed_stage(metrics, 'write'):
+                output_files.append(stream.close())
+            if metrics is not None:
+                metrics.add('write', bytes=file_size(stream.path))
+            if on_step: on_step()
+        for filename, stream in workbooks.items():
+            with timed_stage(metrics, 'format'):
+                gradients = table_gradients(filename, bounds.frame(filename))
+            with timed_stage(metrics, 'write'):
+                output_files.append(stream.close(gradients, on_step))
+            if metrics is not None:
+                metrics.add('write', bytes=file_size(stream.output_file))
+    except BaseException:
+        for stream in tables.values():
+            stream.abort()
+        raise
+    return output_files
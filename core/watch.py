@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from core.batch import (add_processing_options, format_result, is_input_workbook, open_cache,
+                        process_file)
+from core.columnar import check_output_format
+from core.fileio import atomic_path
+
+STATE_FILE = '.mprocess-watch.json'
+DEFAULT_POLL_SECONDS = 2.0
+DEFAULT_SETTLE_SECONDS = 5.0
+
+def file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def is_complete_xlsx(path):
+    """仍在写入的 xlsx 缺少 zip 中央目录，无法作为 zip 打开"""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return 'xl/workbook.xml' in zf.namelist()
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+class FolderWatcher:
+    """
+    轮询监视一个或多个目录，新出现或内容变化的 .xlsx 在大小与修改时间稳定 settle_seconds 秒
+    且能作为完整的 xlsx 打开后，交给至多 jobs 个进程并发处理（batch.process_file）。
+    每个文件的排队/运行/完成/失败状态写入 state_path，重启后已完成的文件不会重复处理，
+    排队中或运行中断的文件重新排队；失败的文件在内容变化后才会重试。
+    """
+
+    def __init__(self, directories, mode='auto', rules=(), jobs=None, output_root=None,
+                 state_path=None, settle_seconds=DEFAULT_SETTLE_SECONDS, recursive=False,
+                 **options):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.mode = mode
+        self.rules = list(rules)
+        self.jobs = jobs or os.cpu_count() or 1
+        self.output_root = output_root
+        self.state_path = state_path or os.path.join(output_root or self.directories[0], STATE_FILE)
+        self.settle_seconds = settle_seconds
+        self.recursive = recursive
+        self.options = options  # 传给 process_file 的其余参数
+        self.files = self._load_state()
+        self.queue = [path for path, entry in self.files.items()
+                      if entry['status'] in ('queued', 'running')]
+        for path in self.queue:
+            self.files[path]['status'] = 'queued'
+        self._pending = {}  # path -> (signature, first_seen)
+        self._running = {}  # future -> (path, 处理时的 signature)
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                return json.load(f)['files']
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def save_state(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        with atomic_path(self.state_path) as tmp_path, open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'files': self.files}, f, ensure_ascii=False, indent=2)
+
+    def list_files(self):
+        found = []
+        for directory in self.directories:
+            if self.recursive:
+                names = [os.path.join(root, name)
+                         for root, _, files in os.walk(directory) for name in files]
+            else:
+                names = [os.path.join(directory, name) for name in os.listdir(directory)]
+            found.extend(path for path in names
+                         if is_input_workbook(os.path.basename(path)) and os.path.isfile(path))
+        return sorted(found)
+
+    def output_dir_for(self, path):
+        """与 batch.output_dirs_for 一致：以文件名命名，与其他文件的输出目录冲突时追加序号"""
+        if path in self.files:
+            return self.files[path]['output_dir']
+        used = {entry['output_dir'] for entry in self.files.values()}
+        root = self.output_root or os.path.dirname(path)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        candidate, n = os.path.join(root, stem), 1
+        while candidate in used:
+            n += 1
+            candidate = os.path.join(root, f"{stem}_{n}")
+        return candidate
+
+    def scan(self, now=None):
+        """发现新文件或变化的文件，稳定后加入队列；返回是否仍有未稳定的文件"""
+        now = time.monotonic() if now is None else now
+        for path in self.list_files():
+            try:
+                signature = file_signature(path)
+            except FileNotFoundError:
+                continue
+            entry = self.files.get(path)
+            if path in self.queue or (entry and entry['signature'] == signature):
+                self._pending.pop(path, None)
+                continue
+
+            seen = self._pending.get(path)
+            if seen is None or seen[0] != signature:
+                self._pending[path] = (signature, now)
+            elif now - seen[1] >= self.settle_seconds:
+                # 稳定后仍不是完整的 xlsx 时记为失败，文件再次变化时会重新检查
+                del self._pending[path]
+                entry = {'status': 'queued', 'signature': signature,
+                         'output_dir': self.output_dir_for(path)}
+                if is_complete_xlsx(path):
+                    self.queue.append(path)
+                else:
+                    entry.update(status='failed', error='Not a complete .xlsx file.')
+                self.files[path] = entry
+                self.save_state()
+        for path in list(self._pending):
+            if not os.path.exists(path):
+                del self._pending[path]
+        return bool(self._pending)
+
+    def dispatch(self, pool):
+        """
+        在空闲的工作进程上启动排队中的文件。处理中又发生变化的文件留在队列中，
+        待上一次处理结束后再启动，避免两个进程同时写同一输出目录与增量状态。
+        """
+        if not self.queue or len(self._running) >= self.jobs:
+            return
+        running = {path for path, _ in self._running.values()}
+        waiting = []
+        while self.queue and len(self._running) < self.jobs:
+            path = self.queue.pop(0)
+            if path in running:
+                waiting.append(path)
+                continue
+            entry = self.files[path]
+            if not os.path.exists(path):
+                del self.files[path]
+                continue
+            entry['status'] = 'running'
+            future = pool.submit(process_file, path, self.mode, entry['output_dir'],
+                                 rules=self.rules, **self.options)
+            self._running[future] = (path, entry['signature'])
+            running.add(path)
+        self.queue[:0] = waiting
+        self.save_state()
+
+    def collect(self, futures, on_result=None):
+        for future in futures:
+            path, signature = self._running.pop(future)
+            entry = self.files.get(path)
+            result = future.result()
+            if on_result: on_result(result)
+            if entry is None or entry['signature'] != signature:
+                continue  # 处理期间文件已变化并重新排队，结果已过时
+            entry.update(status='done' if result['ok'] else 'failed', mode=result['mode'],
+                         seconds=result['seconds'], finished=time.time(),
+                         error=result.get('error'))
+        self.save_state()
+
+    def idle(self):
+        return not (self.queue or self._running or self._pending)
+
+    def run(self, poll_seconds=DEFAULT_POLL_SECONDS, once=False, stop=None, on_result=None):
+        """
+        持续监视直到 stop（threading.Event 等）被置位或 KeyboardInterrupt；
+        once=True 时处理完当前已有的文件即返回。
+        """
+        pool = ProcessPoolExecutor(max_workers=self.jobs)
+        try:
+            while stop is None or not stop.is_set():
+                self.scan()
+                self.dispatch(pool)
+                if once and self.idle():
+                    break
+                if self._running:
+                    done, _ = wait(self._running, timeout=poll_seconds, return_when=FIRST_COMPLETED)
+                    self.collect(done, on_result)
+                else:
+                    time.sleep(poll_seconds)
+        finally:
+            # 丢弃尚未开始的任务（cancel_futures 需要 Python 3.9）
+            for future in self._running:
+                future.cancel()
+            pool.shutdown(wait=not self._running)
+            # 中断时未完成的文件在下次启动时重新处理
+            for path, _ in self._running.values():
+                if path in self.files:
+                    self.files[path]['status'] = 'queued'
+            self.save_state()
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m core.watch',
+        description='Watch folders and process new reader exports as they land.')
+    parser.add_argument('directories', nargs='+', help='folders to watch for .xlsx exports')
+    add_processing_options(parser, default_mode='auto')
+    parser.add_argument('--poll', type=float, default=DEFAULT_POLL_SECONDS,
+                        help=f'seconds between folder scans (default: {DEFAULT_POLL_SECONDS:g})')
+    parser.add_argument('--settle', type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help='seconds a file must stay unchanged before it is processed '
+                             f'(default: {DEFAULT_SETTLE_SECONDS:g})')
+    parser.add_argument('--state', default=None,
+                        help=f'job state file (default: {STATE_FILE} in the output root '
+                             'or the first watched folder)')
+    parser.add_argument('--once', action='store_true',
+                        help='process what is already there, then exit')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    missing = [d for d in args.directories if not os.path.isdir(d)]
+    if missing:
+        print(f"❌ Not a directory: {', '.join(missing)}", file=sys.stderr)
+        return 2
+    try:
+        check_output_format(args.format)
+    except ImportError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+    watcher = FolderWatcher(args.directories, args.mode, args.rule, args.jobs, args.output_root,
+                            args.state, args.settle, args.recursive,
+                            sheet_workers=args.sheet_workers, cache=open_cache(args),
+                            write_metrics=args.metrics, profile=args.profile,
+                            output_format=args.format, report=args.report,
+                            incremental=args.incremental, streaming=args.streaming,
+                            kinetics=args.kinetics, wells=args.wells, heatmaps=args.heatmaps,
+                            store=args.store)
+    print(f"👀 Watching {', '.join(watcher.directories)} (state: {watcher.state_path})", flush=True)
+    try:
+        watcher.run(args.poll, args.once, on_result=lambda r: print(format_result(r), flush=True))
+    except KeyboardInterrupt:
+        print("⏹️ Stopped; unfinished files will be resumed on the next start.")
+    failed = [path for path, entry in watcher.files.items() if entry['status'] == 'failed']
+    return 1 if args.once and failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,29 @@
+import os
+
+from openpyxl import load_workbook
+
+from core import dual_core_gui_adapter, single_core
+
+PIPELINES = {'single': single_core, 'dual': dual_core_gui_adapter}
+N_SHEETS = 5
+
+def read_outputs(paths):
+    """{文件名: {sheet: (单元格值, 条件格式)}}，用于逐格比较两次处理的 xlsx 输出；其他格式按字节比较"""
+    outputs = {}
+    for path in paths:
+        if not path.endswith('.xlsx'):
+            with open(path, 'rb') as f:
+                outputs[os.path.basename(path)] = f.read()
+            continue
+        wb = load_workbook(path)
+        outputs[os.path.basename(path)] = {
+            ws.title: ([list(row) for row in ws.iter_rows(values_only=True)],
+                       sorted((str(rng.sqref), repr(rule.colorScale.cfvo), repr(rule.colorScale.color))
+                              for rng in ws.conditional_formatting for rule in rng.rules))
+            for ws in wb.worksheets
+        }
+        wb.close()
+    return outputs
+
+def run(mode, source, output_dir, **options):
+    return read_outputs(PIPELINES[mode].run_main(str(source), output_dir=str(output_dir), **options))
@@ -0,0 +1,17 @@
+import pytest
+
+from benchmarks.synthetic import make_workbook
+from tests.common import N_SHEETS, run
+
+@pytest.fixture(params=['single', 'dual'])
+def mode(request):
+    return request.param
+
+@pytest.fixture
+def source(tmp_path, mode):
+    return make_workbook(str(tmp_path / f'{mode}.xlsx'), mode, N_SHEETS)
+
+@pytest.fixture
+def expected(tmp_path, mode, source):
+    """串行、一次性保存的输出作为基准"""
+    return run(mode, source, tmp_path / 'serial')
@@ -0,0 +1,34 @@
+import os
+
+from benchmarks.synthetic import make_workbook
+from core import batch
+
+def test_collect_inputs_skips_outputs(tmp_path):
+    for name in ['b.xlsx', 'a.xlsx', '~$a.xlsx', '.partial.xlsx', 'DR.xlsx', 'notes.txt']:
+        (tmp_path / name).write_bytes(b'')
+    a = str(tmp_path / 'a.xlsx')
+    assert batch.collect_inputs([str(tmp_path), a]) == [a, str(tmp_path / 'b.xlsx')]
+
+def test_output_dirs_for_same_name(tmp_path):
+    inputs = [str(tmp_path / 'x' / 'plate.xlsx'), str(tmp_path / 'y' / 'plate.xlsx')]
+    root = str(tmp_path / 'out')
+    assert batch.output_dirs_for(inputs, root) == [os.path.join(root, 'plate'),
+                                                   os.path.join(root, 'plate_2')]
+
+def test_resolve_mode_rules_then_layout(tmp_path):
+    source = make_workbook(str(tmp_path / 'run-dual.xlsx'), 'dual', 1)
+    assert batch.resolve_mode(source, 'auto') == 'dual'
+    assert batch.resolve_mode(source, 'auto', [('*-DUAL*', 'single')]) == 'single'
+    assert batch.resolve_mode(source, 'single', [('*.csv', 'dual')]) == 'single'
+
+def test_batch_main(tmp_path):
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+    make_workbook(str(inbox / 'single.xlsx'), 'single', 2)
+    make_workbook(str(inbox / 'dual.xlsx'), 'dual', 2)
+    (inbox / 'broken.xlsx').write_bytes(b'not a workbook')
+    out = tmp_path / 'out'
+    assert batch.main([str(inbox), '-m', 'auto', '-j', '2', '-o', str(out)]) == 1
+    assert sorted(os.listdir(out / 'single')) == ['DR.xlsx', 'Kinetics.xlsx']
+    assert 'DR485-Kinetics.xlsx' in os.listdir(out / 'dual')
+    assert not (out / 'broken').exists()
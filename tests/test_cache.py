@@ -0,0 +1,35 @@
+import os
+
+from benchmarks.synthetic import make_workbook
+from core.cache import PlateCache, iter_sheet_blocks
+from core.layout import DUAL
+
+def test_cache_hit_skips_parsing(tmp_path, monkeypatch):
+    source = make_workbook(str(tmp_path / 'dual.xlsx'), 'dual', 2)
+    cache = PlateCache(str(tmp_path / 'cache'))
+    parsed = list(iter_sheet_blocks(source, DUAL, cache=cache))
+
+    # 命中缓存时不再解析 xlsx
+    monkeypatch.setattr('core.cache.iter_sheets', None)
+    cached = list(iter_sheet_blocks(source, DUAL, cache=cache))
+    assert [name for name, _, _ in cached] == [name for name, _, _ in parsed]
+    for (_, values, markers), (_, expected, expected_markers) in zip(cached, parsed):
+        assert (values == expected).all() and markers == expected_markers
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    sources = [make_workbook(str(tmp_path / f'{i}.xlsx'), 'dual', 1, seed=i) for i in range(3)]
+    cache = PlateCache(str(tmp_path / 'cache'))
+    keys = []
+    for i, source in enumerate(sources[:2]):
+        list(iter_sheet_blocks(source, DUAL, cache=cache))
+        keys.append(max(os.listdir(cache.cache_dir), key=lambda name: os.path.getmtime(
+            os.path.join(cache.cache_dir, name))))
+        os.utime(os.path.join(cache.cache_dir, keys[-1]), (i, i))
+    entry_size = os.path.getsize(os.path.join(cache.cache_dir, keys[0]))
+
+    # 上限只容得下两项：读取第一项后，第二项成为最久未使用的一项
+    cache.max_bytes = 2 * entry_size + entry_size // 2
+    cache.load(keys[0][:-len('.npz')])
+    list(iter_sheet_blocks(sources[2], DUAL, cache=cache))
+    remaining = os.listdir(cache.cache_dir)
+    assert len(remaining) == 2 and keys[0] in remaining and keys[1] not in remaining
@@ -0,0 +1,31 @@
+import os
+
+import pandas as pd
+import pytest
+
+from core.columnar import TableStream, patch_table, read_table, save_table
+
+@pytest.mark.parametrize('output_format', ['parquet', 'feather', 'csv'])
+def test_table_stream_without_rows(tmp_path, output_format):
+    if output_format != 'csv':
+        pytest.importorskip('pyarrow')
+    stream = TableStream(str(tmp_path / f'DR.{output_format}'), output_format, ['ID', 'DR'])
+    assert list(read_table(stream.close(), output_format).columns) == ['ID', 'DR']
+
+def test_patch_table_interrupted_append(tmp_path, monkeypatch):
+    path = str(tmp_path / 'DR.csv')
+    save_table(pd.DataFrame({'ID': [1, 2], 'DR': [0.5, 1.5]}), path, 'csv')
+    with open(path, 'rb') as f:
+        before = f.read()
+
+    def interrupted(self, target, **kwargs):
+        with open(target, 'a') as f:
+            f.write('3,')
+        raise OSError('disk full')
+
+    monkeypatch.setattr(pd.DataFrame, 'to_csv', interrupted)
+    with pytest.raises(OSError):
+        patch_table(pd.DataFrame({'ID': [3], 'DR': [2.5]}), path, 'csv', [2])
+    with open(path, 'rb') as f:
+        assert f.read() == before
+    assert os.listdir(tmp_path) == ['DR.csv']
@@ -0,0 +1,50 @@
+from openpyxl import load_workbook
+
+from benchmarks.synthetic import make_workbook
+from core.layout import DUAL, well_names
+from tests.common import N_SHEETS, run
+
+# 原流程（基线版本的 dual_core_gui_adapter）对 make_workbook(..., 'dual', N_SHEETS) 输出的取值：
+# {文件名: {(样本, 列): 值}}。T 列按 DataFrame.round 舍入，DR/AU 列逐单元格 round，两者在这些值上不同
+ORIGINAL_DUAL_VALUES = {
+    'DR485-Kinetics.xlsx': {
+        ('P001-G02', 'T2'): 1.7,
+        ('P002-A12', 'T3'): 2.84,
+        ('P002-B02', 'T1'): 0.66,
+        ('P001-B09', 'DR485'): 1.97,
+        ('P004-A12', 'AU'): 24.89,
+    },
+    'DR.xlsx': {
+        ('P001-B09', 'DR485'): 1.97,
+        ('P001-F08', 'DF485'): 1.39,
+        ('P001-F09', 'DR420'): 1.81,
+    },
+}
+
+def cell_values(outputs, filename):
+    """{样本: {列: 值}}"""
+    rows, _ = outputs[filename]['Sheet1']
+    header = rows[0]
+    return {row[header.index('Sample')]: dict(zip(header, row)) for row in rows[1:]}
+
+def test_dual_matches_original_rounding(tmp_path):
+    source = make_workbook(str(tmp_path / 'dual.xlsx'), 'dual', N_SHEETS)
+    outputs = run('dual', source, tmp_path / 'out')
+    for filename, values in ORIGINAL_DUAL_VALUES.items():
+        by_sample = cell_values(outputs, filename)
+        for (sample, column), value in values.items():
+            assert by_sample[sample][column] == value, (filename, sample, column)
+
+def test_dual_text_outside_read_rows(tmp_path):
+    # 孔位列中读取窗口之外的文本（如第 3 行的孔位名）不影响舍入：T 列仍按 DataFrame.round。
+    # 原流程此时对整个文件的 T 列逐单元格 round，2.675 写为 2.67（见 README）
+    source = tmp_path / 'labelled.xlsx'
+    wb = load_workbook(make_workbook(str(source), 'dual', 2))
+    t1_row = DUAL['modules']['DR485'][0] + 1
+    for ws in wb:
+        for col, well in enumerate(well_names(), start=3):
+            ws.cell(3, col, well)
+    wb.worksheets[1].cell(t1_row, 3, 2.675)
+    wb.save(source)
+    outputs = run('dual', source, tmp_path / 'out')
+    assert cell_values(outputs, 'DR485-Kinetics.xlsx')['P002-A01']['T1'] == 2.68
@@ -0,0 +1,21 @@
+from core import api
+from tests.common import read_outputs, run
+
+def test_parallel_keeps_sheet_order(tmp_path, mode, source, expected):
+    assert run(mode, source, tmp_path / 'parallel', workers=2) == expected
+
+def test_streaming(tmp_path, mode, source, expected):
+    assert run(mode, source, tmp_path / 'streaming', streaming=True) == expected
+
+def test_api_process(tmp_path, mode, source, expected):
+    result = api.process(source, workbooks=True)
+    assert result['mode'] == mode
+    assert list(result['tables']) == list(expected)
+    paths = api.save_outputs(result['workbooks'], str(tmp_path / 'api'))
+    assert read_outputs(paths) == expected
+
+def test_api_read_tables_from_bytes(tmp_path, mode, source, expected):
+    with open(source, 'rb') as f:
+        tables = api.read_tables(f.read(), mode)
+    paths = api.save_outputs(api.render_workbooks(tables, mode), str(tmp_path / 'api'))
+    assert read_outputs(paths) == expected
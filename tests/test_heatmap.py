@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from benchmarks.synthetic import make_workbook
+from core import api
+from core.heatmap import HEATMAP_DIR, LUT_SIZE, color_index, plate_values, render_heatmaps
+
+def test_color_index_centered():
+    index = color_index([-2.0, 0.0, 4.0, np.nan], -2.0, 4.0, centered=True)
+    assert index.tolist() == [0, round(0.5 * (LUT_SIZE - 1)), LUT_SIZE - 1, LUT_SIZE]
+
+def test_plate_values_by_sheet():
+    df = pd.DataFrame({'Source': ['P1'] * 96 + ['P2'] * 96, 'DR': np.arange(192.0).astype(object)})
+    df.loc[5, 'DR'] = 'OVRFLW'  # 标记记为缺失值
+    plates, names = plate_values(df, 'DR', 96)
+    assert plates.shape == (2, 8, 12) and names == ['P1', 'P2']
+    assert np.isnan(plates[0, 0, 5]) and plates[1, 7, 11] == 191
+
+def test_heatmaps_parallel_matches_serial(tmp_path):
+    df = pd.DataFrame({'Source': [f'P{i}' for i in range(3) for _ in range(96)],
+                       'DR': np.random.default_rng(0).normal(size=3 * 96)})
+    colors = {'DR': ('00FF00', 'FFFFFF', 'FF69B4')}
+    serial = render_heatmaps(df, colors, str(tmp_path / 'serial'))
+    parallel = render_heatmaps(df, colors, str(tmp_path / 'parallel'), workers=2)
+    assert len(serial) == 4  # 3 张板图 + 1 张总览
+    for a, b in zip(serial, parallel):
+        with open(a, 'rb') as fa, open(b, 'rb') as fb:
+            assert fa.read() == fb.read()
+
+def test_heatmaps_dual_values(tmp_path):
+    source = make_workbook(str(tmp_path / 'dual.xlsx'), 'dual', 2)
+    paths = api.save_heatmaps(api.read_tables(source, 'dual'), 'dual', str(tmp_path))
+    root = os.path.join(str(tmp_path), HEATMAP_DIR)
+    assert sorted(name for name in os.listdir(root) if name.endswith('.png')) == sorted(
+        f'{value}.png' for value in ['DR485', 'DR420', 'DF485', 'DF420', 'AU', 'DR485-Kinetics-T6',
+                                     'DR420-Kinetics-T6', 'DF485-Kinetics-T6', 'DF420-Kinetics-T6'])
+    assert len(paths) == 9 * 3
+    with Image.open(os.path.join(root, 'DR485-Kinetics-T6', 'P001-Ctrl.png')) as image:
+        assert image.mode == 'RGB'
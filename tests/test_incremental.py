@@ -0,0 +1,44 @@
+import shutil
+
+from openpyxl import load_workbook
+
+from benchmarks.synthetic import make_workbook
+from core.progress import RunMetrics
+from tests.common import N_SHEETS, run
+
+def extracted_sheets(metrics):
+    return metrics.stages['extract']['sheets']
+
+def test_incremental_matches_full_run(tmp_path, mode, source, expected):
+    assert run(mode, source, tmp_path / 'incremental', incremental=True) == expected
+
+def test_incremental_appended_sheets(tmp_path, mode, source, expected):
+    # 先增量处理前 3 个 sheet，再追加其余 sheet（同一 seed 下前 3 个 sheet 的内容不变）
+    partial = tmp_path / 'growing.xlsx'
+    make_workbook(str(partial), mode, 3)
+    run(mode, partial, tmp_path / 'incremental', incremental=True)
+    shutil.copyfile(source, partial)
+    metrics = RunMetrics()
+    assert run(mode, partial, tmp_path / 'incremental', incremental=True,
+               metrics=metrics) == expected
+    assert extracted_sheets(metrics) == N_SHEETS - 3
+
+def test_incremental_changed_sheet(tmp_path, mode, source):
+    # 两个文件均经 openpyxl 保存，未改动的 sheet 的 XML 相同；只有第 2 个 sheet 需要重新解析
+    growing, changed = tmp_path / 'growing.xlsx', tmp_path / 'changed.xlsx'
+    wb = load_workbook(source)
+    wb.save(growing)
+    ws = wb.worksheets[1]
+    for row in ws.iter_rows(min_row=2, min_col=3):
+        for cell in row:
+            cell.value = -cell.value
+    wb.save(changed)
+    options = {'output_format': 'csv', 'report': True}
+    expected = run(mode, changed, tmp_path / 'serial', **options)
+
+    run(mode, growing, tmp_path / 'incremental', incremental=True, **options)
+    shutil.copyfile(changed, growing)
+    metrics = RunMetrics()
+    assert run(mode, growing, tmp_path / 'incremental', incremental=True, metrics=metrics,
+               **options) == expected
+    assert extracted_sheets(metrics) == 1
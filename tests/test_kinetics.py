@@ -0,0 +1,42 @@
+import numpy as np
+
+from core.kinetics import auc, kinetic_metrics, ratio, slope, time_points, time_to_half_max
+
+TIMES = time_points(10)
+RISING = np.arange(1.0, 11.0)
+
+def metrics(*traces):
+    return kinetic_metrics(np.array(traces, dtype=float))
+
+def test_linear_trace():
+    assert np.allclose(metrics(RISING), [[1.0, 5.5, 49.5]])
+
+def test_falling_trace():
+    # 下降曲线：斜率为负，THalf 按变化量的绝对值计算
+    assert np.allclose(metrics(RISING[::-1]), [[-1.0, 5.5, 49.5]])
+
+def test_flat_trace():
+    slope_, thalf, area = metrics(np.full(10, 2.0))[0]
+    assert slope_ == 0 and np.isnan(thalf) and area == 18.0
+
+def test_half_max_reached_at_a_time_point():
+    trace = np.array([[0.0, 2.0, 4.0, 4.0]])
+    assert time_to_half_max(trace, time_points(4)) == [2.0]
+
+def test_missing_points():
+    trace = RISING.copy()
+    trace[4] = np.nan
+    assert slope(trace[None], TIMES) == [1.0]
+    assert np.isnan(auc(trace[None], TIMES)[0])
+    first_missing = RISING.copy()
+    first_missing[0] = np.nan
+    assert np.isnan(time_to_half_max(first_missing[None], TIMES)[0])
+
+def test_slope_needs_two_points():
+    trace = np.full((1, 10), np.nan)
+    trace[0, 3] = 1.0
+    assert np.isnan(slope(trace, TIMES)[0])
+
+def test_ratio_zero_denominator():
+    assert np.allclose(ratio(np.array([[2.0, 1.0, 0.0]]), np.array([[4.0, 0.0, 2.0]])),
+                       [[0.5, np.nan, 0.0]], equal_nan=True)
@@ -0,0 +1,37 @@
+from openpyxl import load_workbook
+
+from benchmarks.synthetic import make_workbook
+from core import api
+from core.layout import LAYOUTS
+from core.sniff import sniff
+from tests.common import run
+
+def test_explicit_mode_when_both_layouts_fit(tmp_path):
+    # 单通道导出在第 151 行之后仍有数值时双通道版式也相符；显式指定 single 时仍按单通道处理
+    source = make_workbook(str(tmp_path / 'single.xlsx'), 'single', 1)
+    wb = load_workbook(source)
+    ws = wb.active
+    for r in range(ws.max_row + 1, 161):
+        ws.append([f'Row {r}', None] + [0.1] * 96)
+    wb.save(source)
+    assert api.process(source)['mode'] == 'dual'
+    outputs = run('single', source, tmp_path / 'out')
+    assert len(outputs['Kinetics.xlsx']['Sheet1'][0]) == 97
+
+def test_stray_cell_past_the_plate(tmp_path, mode, source, expected):
+    # 孔板右侧的备注使工作表尺寸宽于 96 孔；孔板规格按数据行判断，输出不变
+    wb = load_workbook(source)
+    wb.worksheets[0].cell(row=1, column=100, value='note')
+    wb.save(source)
+    assert run(mode, source, tmp_path / 'stray') == expected
+
+def test_markers_at_both_ends_of_a_row(tmp_path):
+    # 第 23 行（DR）首尾孔位为饱和标记时该行仍有数值，版式相符
+    source = make_workbook(str(tmp_path / 'single.xlsx'), 'single', 1)
+    wb = load_workbook(source)
+    wb.active['C23'] = wb.active['CT23'] = 'OVRFLW'
+    wb.save(source)
+    template = sniff(source, LAYOUTS['single'], cache=False)
+    assert template['fits'] and template['wells'] == 96
+    rows, _ = run('single', source, tmp_path / 'out')['DR.xlsx']['Sheet1']
+    assert [row[rows[0].index('DR')] for row in (rows[1], rows[96])] == ['OVRFLW', 'OVRFLW']
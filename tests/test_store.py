@@ -0,0 +1,19 @@
+import pytest
+
+from benchmarks.synthetic import make_workbook
+from core import api
+from core.store import ResultStore
+
+def test_store_keeps_other_mode(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.sqlite'))
+    source = make_workbook(str(tmp_path / 'dual.xlsx'), 'dual', 2)
+    for mode in ('single', 'dual'):
+        store.upsert(source, mode, api.read_tables(source, mode).items())
+    counts = {name: len(store.query(f'SELECT * FROM {name}')) for name in store.tables('DR.xlsx')}
+    assert counts == {'dual_DR': 2 * 96, 'single_DR': 2 * 96}
+    assert sorted(store.sample_history('P001-A01')['mode']) == ['dual', 'single']
+    assert store.top_k('DR', k=1, per=None)['mode'].tolist() == ['single']
+    assert sorted(store.runs()['mode']) == ['dual', 'single']
+    with pytest.raises(Exception, match='readonly'):
+        store.query('DELETE FROM single_DR')
+    assert len(store.query('SELECT * FROM single_DR')) == 2 * 96
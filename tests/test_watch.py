@@ -0,0 +1,55 @@
+import os
+from concurrent.futures import Future
+
+from benchmarks.synthetic import make_workbook
+from core.watch import FolderWatcher
+
+class StubPool:
+    """只记录提交的任务，由测试决定何时完成"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, path, *args, **kwargs):
+        future = Future()
+        self.submitted.append((path, future))
+        return future
+
+def finish(watcher, future):
+    future.set_result({'ok': True, 'mode': 'dual', 'seconds': 0.0})
+    watcher.collect([future])
+
+def settle(watcher):
+    watcher.scan(now=0)
+    watcher.scan(now=1)
+
+def test_watch_file_changed_while_running(tmp_path):
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+    path = make_workbook(str(inbox / 'plate.xlsx'), 'dual', 1)
+    watcher = FolderWatcher([str(inbox)], 'dual', jobs=2, output_root=str(tmp_path / 'out'),
+                            settle_seconds=0)
+    pool = StubPool()
+    settle(watcher)
+    watcher.dispatch(pool)
+    assert len(pool.submitted) == 1
+    first_signature = watcher.files[path]['signature']
+
+    # 处理期间文件被改写：重新排队，但不与仍在运行的任务同时启动
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    settle(watcher)
+    assert watcher.queue == [path]
+    watcher.dispatch(pool)
+    assert len(pool.submitted) == 1
+
+    # 旧任务的结果不能把新内容记为完成
+    finish(watcher, pool.submitted[0][1])
+    entry = watcher.files[path]
+    assert entry['status'] == 'queued' and entry['signature'] != first_signature
+
+    watcher.dispatch(pool)
+    assert len(pool.submitted) == 2
+    finish(watcher, pool.submitted[1][1])
+    assert watcher.files[path]['status'] == 'done'
+    assert watcher.idle()